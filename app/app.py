@@ -1,25 +1,153 @@
-from flask import Flask, request, jsonify, render_template
+from flask import (
+    Flask,
+    Response,
+    request,
+    jsonify,
+    render_template,
+    make_response,
+    g,
+    stream_with_context,
+)
 from flask_sqlalchemy import SQLAlchemy
 from marshmallow import Schema, fields
 from flask_migrate import Migrate
-import os
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
+import os
+import queue
+import secrets
+import sqlite3
+import string
+from dotenv import load_dotenv
 from slugify import slugify
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import bulk
+import mvt
+import spatial
+import sqlite_retry
+from cache import DataVersion, LRUCache, PayloadCache, TileCache, connect_redis
+from events import EventBroker
+from clustering import (
+    CLUSTER_MAX_ZOOM,
+    WORLD_CLUSTER_MAX_ZOOM,
+    ClusterCache,
+    grid_clusters,
+    snap_bbox,
+)
+
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent_monkey = None
+
+try:
+    from psycogreen.gevent import patch_psycopg
+except ImportError:
+    patch_psycopg = None
 
 
 # Инициализация приложения и подключение к SQLite
 app = Flask(__name__, template_folder="templates", static_folder="static")
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(basedir, "data.db")
-# TODO
-# load_dotenv()
-# DATABASE_URI = os.getenv("DATABASE_URI")
-# app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URI
+load_dotenv()
+# База берется из DATABASE_URI (например, postgresql://user:pass@db/botpc),
+# без нее — локальный файл SQLite
+DATABASE_URI = os.getenv("DATABASE_URI") or "sqlite:///" + os.path.join(basedir, "data.db")
+# SQLAlchemy 1.4 не принимает устаревшую схему postgres://
+if DATABASE_URI.startswith("postgres://"):
+    DATABASE_URI = "postgresql://" + DATABASE_URI[len("postgres://"):]
+app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URI
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False  # Отключаем tracking
+# Воркер gunicorn с gevent: блокирующее ожидание в C-коде драйвера БД
+# останавливает все гринлеты воркера
+GEVENT_WORKER = gevent_monkey is not None and gevent_monkey.is_module_patched("socket")
+# Сколько всего писатель ждет освобождения SQLite, прежде чем получить
+# "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS") or 10000)
+if DATABASE_URI.startswith("sqlite"):
+    # Файловую SQLite SQLAlchemy 1.4 открывает через NullPool: соединение и
+    # все PRAGMA заново на каждый запрос, кэш страниц выбрасывается. Держим
+    # соединения в пуле; check_same_thread=False — соединение переходит
+    # между потоками (гринлетами) воркера, но одновременно им пользуется один
+    if ":memory:" not in DATABASE_URI and DATABASE_URI.rstrip("/") != "sqlite:":
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "poolclass": QueuePool,
+            "pool_size": int(os.getenv("SQLITE_POOL_SIZE", 5)),
+            "max_overflow": int(os.getenv("SQLITE_MAX_OVERFLOW", 5)),
+            "connect_args": {"check_same_thread": False},
+        }
+        if GEVENT_WORKER:
+            # Под gevent занятую базу ждем повторами через gevent.sleep,
+            # а busy_timeout в SQLITE_PRAGMAS остается коротким
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"]["factory"] = (
+                sqlite_retry.connection_factory(SQLITE_BUSY_TIMEOUT_MS / 1000, gevent.sleep)
+            )
+else:
+    # Пул свой у каждого воркера gunicorn: всего к серверу БД может быть
+    # открыто workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) соединений
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        # Соединения старше стольких секунд переоткрываются, не дожидаясь,
+        # пока их закроет сервер или балансировщик
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        # Проверка соединения перед выдачей из пула: после рестарта БД
+        # запрос получит новое соединение вместо ошибки
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+    # Под gevent-воркером psycopg2 блокирует весь процесс на время запроса;
+    # psycogreen переключает его ожидание на гринлеты
+    if GEVENT_WORKER and patch_psycopg is not None:
+        patch_psycopg()
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
+# Профиль SQLite для нескольких воркеров gunicorn: WAL не дает писателю
+# блокировать читателей, busy_timeout ждет освобождения записи вместо
+# мгновенного "database is locked" (под gevent — лишь первые миллисекунды,
+# дальше ждут повторы sqlite_retry). Пустое значение переменной — не трогать pragma.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL в режиме WAL не теряет целостность, только последние коммиты при сбое питания
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": (
+        os.getenv("SQLITE_GEVENT_BUSY_TIMEOUT_MS", "5")
+        if GEVENT_WORKER
+        else str(SQLITE_BUSY_TIMEOUT_MS)
+    ),
+    # mmap общий для всех соединений процесса: страницы лежат в кэше ОС
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    # Отрицательное значение — размер в КиБ, т.е. до 16 МБ на соединение;
+    # на воркер это до (SQLITE_POOL_SIZE + SQLITE_MAX_OVERFLOW) * 16 МБ
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", str(-16 * 1024)),
+}
+
+
+@db.event.listens_for(Engine, "connect")
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        if value:
+            cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+# Redis общий для всех воркеров; без него версия данных карты живет в процессе
+redis_client = connect_redis(os.getenv("REDIS_HOST"), int(os.getenv("REDIS_PORT", 6379)))
+data_version = DataVersion(redis_client)
+# Версия состава групп: от нее зависят только карты групп, поэтому
+# вступление в группу не сбрасывает кэши общей карты
+members_version = DataVersion(redis_client, "map:members:version")
+event_broker = EventBroker(redis_client)
+
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -40,6 +168,8 @@ class Location(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(120), nullable=False)
+    # Геохэш координат для поиска соседей, заполняется автоматически
+    geohash = db.Column(db.String(spatial.GEOHASH_PRECISION), index=True)
     user_id = db.Column(
         db.Integer, db.ForeignKey("user.id"), nullable=False, index=True
     )
@@ -51,6 +181,15 @@ class Location(db.Model):
         onupdate=lambda: datetime.now(timezone.utc),
     )
 
+    # Индекс под выборку точек по прямоугольнику видимой области карты
+    __table_args__ = (db.Index("ix_location_lat_lon", "latitude", "longitude"),)
+
+
+@db.event.listens_for(Location, "before_insert")
+@db.event.listens_for(Location, "before_update")
+def set_location_geohash(mapper, connection, target):
+    target.geohash = spatial.encode(target.latitude, target.longitude)
+
 
 class Group(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +227,33 @@ class UserGroup(db.Model):
         "Group", back_populates="members", overlaps="users_in_group"
     )
 
+    __table_args__ = (
+        # Группы пользователя по порядку group_id без сортировки в памяти
+        db.Index("ix_user_group_user_group", "user_id", "group_id"),
+        # Одно членство на пару; по нему же вступление, выход и число
+        # участников группы считаются только по индексу
+        db.Index("ux_user_group_group_user", "group_id", "user_id", unique=True),
+    )
+
+
+class LocationChange(db.Model):
+    """
+    Журнал изменений точек карты для дельта-синхронизации клиентов.
+    id записи служит версией: клиент запрашивает изменения после известной ему.
+    Для удаленных точек запись остается как надгробие (action="delete").
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, nullable=False)
+    # "add", "update" или "delete"
+    action = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), index=True
+    )
+
+    # Версии не должны повторяться после очистки журнала
+    __table_args__ = {"sqlite_autoincrement": True}
+
 
 # Маршаллинг схем для сериализации/десериализации объектов
 class UserSchema(Schema):
@@ -133,17 +299,27 @@ group_schema = GroupSchema()
 user_group_schema = UserGroupSchema()
 
 
-def generate_unique_group_code(title: str) -> str:
-    base_slug = slugify(title)
-    slug = base_slug
-    counter = 1
+# Случайный суффикс ссылки группы: 36^6 ≈ 2 млрд вариантов на одно название
+GROUP_LINK_ALPHABET = string.ascii_lowercase + string.digits
+GROUP_LINK_SUFFIX_LENGTH = 6
+GROUP_LINK_ATTEMPTS = 5
+# Ссылка уходит в параметр start=join_<ссылка>, а он не длиннее 64 символов
+GROUP_LINK_SLUG_MAX_LENGTH = 64 - len("join_") - GROUP_LINK_SUFFIX_LENGTH - 1
 
-    # Проверяем в базе, есть ли уже такая ссылка
-    while Group.query.filter_by(group_link=slug).first() is not None:
-        slug = f"{base_slug}-{counter}"
-        counter += 1
 
-    return slug
+def group_link_candidates(title: str):
+    """
+    Варианты ссылки группы: сначала сам slug названия, затем slug со
+    случайным суффиксом. Занятость не проверяется запросами — ее
+    определяет уникальный индекс при вставке, см. create_group.
+    """
+    base_slug = slugify(title, max_length=GROUP_LINK_SLUG_MAX_LENGTH) or "group"
+    yield base_slug
+    for _ in range(GROUP_LINK_ATTEMPTS):
+        suffix = "".join(
+            secrets.choice(GROUP_LINK_ALPHABET) for _ in range(GROUP_LINK_SUFFIX_LENGTH)
+        )
+        yield f"{base_slug}-{suffix}"
 
 
 # Основные маршруты API
@@ -164,92 +340,498 @@ def error_response(message, status_code=400, details=None):
     return jsonify(response), status_code
 
 
-def success_response(message, data=None, status_code=200):
+def success_response(message, data=None, status_code=200, paging=None):
     response = {"status": "success", "message": message}
     # if data:
     response["data"] = data
+    if paging is not None:
+        response["paging"] = paging
     return jsonify(response), status_code
 
 
+PAGE_DEFAULT_LIMIT = 20
+PAGE_MAX_LIMIT = 100
+
+
+def parse_page_args(args=None):
+    """
+    Параметры keyset-пагинации: ?limit=&cursor= (после id) или &before= (до id).
+    ValueError при неверных значениях.
+    """
+    args = request.args if args is None else args
+    limit = int(args.get("limit", PAGE_DEFAULT_LIMIT))
+    cursor = args.get("cursor")
+    before = args.get("before")
+    cursor = int(cursor) if cursor else None
+    before = int(before) if before else None
+    return min(max(limit, 1), PAGE_MAX_LIMIT), cursor, before
+
+
+def keyset_page(query, key, limit, cursor=None, before=None):
+    """
+    Страница query по возрастанию key через WHERE key > cursor
+    (или key < before) вместо OFFSET: стоимость не зависит от того,
+    насколько далеко пролистан список. Возвращает (строки, paging).
+    """
+    if before is not None:
+        rows = query.filter(key < before).order_by(key.desc()).limit(limit + 1).all()
+        has_prev = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_next = True
+    else:
+        page = query.filter(key > cursor) if cursor is not None else query
+        rows = page.order_by(key).limit(limit + 1).all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        has_prev = cursor is not None
+
+    def key_of(row):
+        return getattr(row, key.key)
+
+    def exists(condition):
+        return db.session.query(query.filter(condition).exists()).scalar()
+
+    # Курсор мог указывать на уже удаленную строку — вторую сторону проверяем по факту
+    if rows and before is not None:
+        has_next = exists(key > key_of(rows[-1]))
+    if rows and has_prev and before is None:
+        has_prev = exists(key < key_of(rows[0]))
+    paging = {
+        "limit": limit,
+        "next_cursor": key_of(rows[-1]) if rows and has_next else None,
+        "prev_cursor": key_of(rows[0]) if rows and has_prev else None,
+    }
+    return rows, paging
+
+
 # --------------------------
-# USER ROUTES
+# ОПЕРАЦИИ
 # --------------------------
-@app.route("/api/user/add", methods=["POST"])
-def add_user():
-    data = request.get_json()
-    telegram_id = data.get("telegram_id")
-    username = data.get("username")
-    first_name = data.get("first_name")
+# Логика записи вынесена из маршрутов в операции: одна и та же операция
+# выполняется отдельным запросом или в составе /api/batch. Операция не
+# коммитит сама, а то, что можно делать только после коммита (сброс кэшей
+# карты, рассылка изменений), складывает в effects.
 
-    if not telegram_id:
-        return error_response("Поле telegram_id обязательно.")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if user:
-        return success_response(
-            "Пользователь уже существует.", {"training_stage": user.training_stage}, 201
-        )
+class OperationError(Exception):
+    def __init__(self, message, status_code=400, details=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.details = details
+
+
+# telegram_id -> user.id: id пользователя не меняется, поэтому почти каждый
+# маршрут обходится без запроса к таблице user
+user_ids = LRUCache(maxsize=10000, ttl=600)
+# Найденные в текущей транзакции id попадают в user_ids только после ее
+# коммита: строка из откатанной транзакции могла бы отдать свой id
+# следующему зарегистрированному пользователю
+PENDING_USER_IDS = "pending_user_ids"
+
+
+def remember_user_id(telegram_id: int, user_id: int):
+    db.session.info.setdefault(PENDING_USER_IDS, {})[telegram_id] = user_id
+
+
+@db.event.listens_for(db.session, "after_commit")
+def cache_committed_user_ids(session):
+    for telegram_id, user_id in session.info.pop(PENDING_USER_IDS, {}).items():
+        user_ids.set(telegram_id, user_id)
+
+
+@db.event.listens_for(db.session, "after_rollback")
+def forget_rolled_back_user_ids(session):
+    session.info.pop(PENDING_USER_IDS, None)
 
+
+@app.teardown_request
+def cache_read_user_ids(error):
+    """
+    Запрос только на чтение не коммитит, а его id прочитаны из уже
+    закоммиченных данных — их кэшируем в конце запроса. Все пути записи
+    заканчиваются коммитом или откатом, поэтому здесь чужих id не бывает.
+    """
+    pending = db.session.info.pop(PENDING_USER_IDS, {})
+    if error is None:
+        for telegram_id, user_id in pending.items():
+            user_ids.set(telegram_id, user_id)
+
+
+def parse_telegram_id(telegram_id):
+    """telegram_id как int или None, если это не целое число"""
+    if isinstance(telegram_id, bool):
+        return None
     try:
-        new_user = User(
-            telegram_id=telegram_id, username=username, first_name=first_name
+        return int(telegram_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_user_id(telegram_id):
+    """user.id по telegram_id или None, если такого пользователя нет"""
+    telegram_id = parse_telegram_id(telegram_id)
+    if telegram_id is None:
+        return None
+    user_id = user_ids.get(telegram_id)
+    if user_id is None:
+        user_id = db.session.info.get(PENDING_USER_IDS, {}).get(telegram_id)
+    if user_id is None:
+        user_id = (
+            db.session.query(User.id).filter(User.telegram_id == telegram_id).scalar()
         )
-        db.session.add(new_user)
-        db.session.commit()
-        return success_response(
-            "Пользователь успешно добавлен.",
-            {"training_stage": new_user.training_stage},
-            200,
+        if user_id is not None:
+            remember_user_id(telegram_id, user_id)
+    return user_id
+
+
+def find_user_id(telegram_id):
+    if not telegram_id:
+        raise OperationError("Требуется telegram_id пользователя")
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
+        raise OperationError("Пользователь не найден", 404)
+    return user_id
+
+
+def is_postgres():
+    return db.engine.dialect.name == "postgresql"
+
+
+def upsert_user_statement(dialect):
+    """
+    Регистрация пользователя одним INSERT ... ON CONFLICT DO UPDATE:
+    без предварительного SELECT и без гонки двух первых сообщений.
+    updated_at меняется только при смене имени, поэтому по нему (и по
+    created_at) видно, вставлена строка, переименована или не изменилась.
+    """
+    distinct = "IS DISTINCT FROM" if dialect.name == "postgresql" else "IS NOT"
+    sql = f"""
+        INSERT INTO "user" (telegram_id, username, first_name, training_stage, created_at, updated_at)
+        VALUES (:telegram_id, :username, :first_name, 0, :now, :now)
+        ON CONFLICT (telegram_id) DO UPDATE SET
+            username = excluded.username,
+            first_name = excluded.first_name,
+            updated_at = CASE
+                WHEN "user".username {distinct} excluded.username
+                    OR "user".first_name {distinct} excluded.first_name
+                THEN excluded.updated_at
+                ELSE "user".updated_at
+            END
+    """
+    returning = "id, training_stage, created_at = :now AS inserted, updated_at = :now AS touched"
+    # RETURNING в SQLite появился в 3.35; на старой библиотеке читаем строку
+    # следующим запросом в той же транзакции
+    if dialect.name == "sqlite" and sqlite3.sqlite_version_info < (3, 35):
+        return (
+            db.text(sql).bindparams(db.bindparam("now", type_=db.DateTime)),
+            db.text(f'SELECT {returning} FROM "user" WHERE telegram_id = :telegram_id')
+            .bindparams(db.bindparam("now", type_=db.DateTime)),
         )
-    except IntegrityError as e:
-        db.session.rollback()
-        return error_response("Ошибка при создании пользователя.", 500, str(e))
+    return (
+        db.text(sql + " RETURNING " + returning).bindparams(
+            db.bindparam("now", type_=db.DateTime)
+        ),
+    )
 
 
-@app.route("/api/user/update_training_stage", methods=["POST"])
-def update_training_stage():
-    data = request.get_json()
-    telegram_id = data.get("telegram_id")
-    new_stage = data.get("new_training_stage")
+def op_add_user(params, effects):
+    telegram_id = params.get("telegram_id")
+    username = params.get("username")
+    first_name = params.get("first_name")
+
+    if not telegram_id:
+        raise OperationError("Поле telegram_id обязательно.")
+    telegram_id = parse_telegram_id(telegram_id)
+    if telegram_id is None:
+        raise OperationError("telegram_id должен быть целым числом")
+
+    values = {
+        "telegram_id": telegram_id,
+        "username": username,
+        "first_name": first_name,
+        "now": datetime.now(timezone.utc),
+    }
+    for statement in upsert_user_statement(db.engine.dialect):
+        result = db.session.execute(statement, values)
+    user = result.one()
+    remember_user_id(telegram_id, user.id)
+
+    if user.inserted:
+        return "Пользователь успешно добавлен.", {"training_stage": user.training_stage}, 200
+
+    # Имя и юзернейм показываются на карте, поэтому при смене обновляем точки
+    if user.touched:
+        location_ids = [
+            row.id for row in db.session.query(Location.id).filter_by(user_id=user.id)
+        ]
+        changes = log_location_changes("update", *location_ids)
+        effects.append(invalidate_map_caches)
+        effects.append(lambda: publish_location_changes(changes))
+    return "Пользователь уже существует.", {"training_stage": user.training_stage}, 201
+
+
+def op_update_training_stage(params, effects):
+    """at_least=true — этап только повышается, но не понижается"""
+    telegram_id = params.get("telegram_id")
+    new_stage = params.get("new_training_stage")
 
     if not telegram_id or new_stage is None:
-        return error_response("Обязательные поля: telegram_id и new_training_stage")
+        raise OperationError("Обязательные поля: telegram_id и new_training_stage")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
-        return error_response("Пользователь не найден", 404)
+    user = db.session.get(User, find_user_id(telegram_id))
+    if user is None:
+        raise OperationError("Пользователь не найден", 404)
+    if params.get("at_least"):
+        new_stage = max(user.training_stage, new_stage)
+    user.training_stage = new_stage
+    return "Стадия обучения обновлена", {"training_stage": user.training_stage}, 200
+
+
+def op_add_location(params, effects):
+    telegram_id = params.get("telegram_id")
+    latitude = params.get("latitude")
+    longitude = params.get("longitude")
+    description = params.get("description")
+
+    if not all([telegram_id, latitude, longitude, description]):
+        raise OperationError("Отсутствуют обязательные поля")
+
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        raise OperationError("Неверный формат координат")
+
+    user_id = find_user_id(telegram_id)
+    new_location = Location(
+        latitude=latitude,
+        longitude=longitude,
+        description=description,
+        user_id=user_id,
+    )
+    db.session.add(new_location)
+    db.session.flush()
+    changes = log_location_changes("add", new_location.id)
+    effects.append(lambda: invalidate_map_caches(latitude, longitude))
+    effects.append(lambda: publish_location_changes(changes))
+    return "Локация добавлена", location_schema.dump(new_location), 201
+
+
+def op_delete_location(params, effects):
+    user_id = find_user_id(params.get("telegram_id"))
+    location = Location.query.filter_by(
+        id=params.get("location_id"), user_id=user_id
+    ).first()
+    if not location:
+        return "Локация не найдена, уже удалена,  или не принадлежит вам", None, 200
+
+    latitude, longitude = location.latitude, location.longitude
+    db.session.delete(location)
+    changes = log_location_changes("delete", location.id)
+    effects.append(lambda: invalidate_map_caches(latitude, longitude))
+    effects.append(lambda: publish_location_changes(changes))
+    return "Локация успешно удалена", None, 200
 
+
+def op_user_locations(params, effects):
     try:
-        user.training_stage = new_stage
+        limit, cursor, before = parse_page_args(params)
+    except ValueError:
+        raise OperationError("limit, cursor и before должны быть целыми числами")
+
+    user_id = find_user_id(params.get("telegram_id"))
+    query = Location.query.filter(Location.user_id == user_id)
+    locations, paging = keyset_page(query, Location.id, limit, cursor, before)
+    return (
+        "Локации пользователя получены",
+        {"items": location_schema.dump(locations, many=True), "paging": paging},
+        200,
+    )
+
+
+OPERATIONS = {
+    "user.add": op_add_user,
+    "user.update_training_stage": op_update_training_stage,
+    "user.locations": op_user_locations,
+    "location.add": op_add_location,
+    "location.delete": op_delete_location,
+}
+
+
+def run_effects(effects):
+    for effect in effects:
+        effect()
+
+
+def run_operation(op, params, error_message):
+    """Одна операция в своей транзакции, ответ в обычном формате API"""
+    effects = []
+    try:
+        message, data, status_code = op(params or {}, effects)
         db.session.commit()
-        return success_response(
-            "Стадия обучения обновлена", {"training_stage": user.training_stage}
+    except OperationError as e:
+        db.session.rollback()
+        return error_response(e.message, e.status_code, e.details)
+    except Exception as e:
+        db.session.rollback()
+        return error_response(error_message, 500, str(e))
+    run_effects(effects)
+
+    # Страницы списков отдаются с paging на верхнем уровне, как и раньше
+    paging = None
+    if isinstance(data, dict) and set(data) == {"items", "paging"}:
+        data, paging = data["items"], data["paging"]
+    return success_response(message, data, status_code, paging=paging)
+
+
+BATCH_MAX_OPERATIONS = 20
+
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """
+    Несколько операций за один запрос и одну транзакцию:
+    {"operations": [{"op": "location.add", "params": {...}}, ...]}
+    Операции выполняются по порядку; если падает любая, откатываются все.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return error_response("Требуется непустой список operations")
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return error_response(f"Не больше {BATCH_MAX_OPERATIONS} операций за запрос")
+
+    effects = []
+    results = []
+    for index, operation in enumerate(operations):
+        name = operation.get("op") if isinstance(operation, dict) else None
+        op = OPERATIONS.get(name)
+        if op is None:
+            db.session.rollback()
+            return error_response(
+                f"Неизвестная операция: {name}", 400, {"index": index, "ops": list(OPERATIONS)}
+            )
+        try:
+            message, result, status_code = op(operation.get("params") or {}, effects)
+        except OperationError as e:
+            db.session.rollback()
+            return error_response(
+                e.message, e.status_code, {"index": index, "op": name, "details": e.details}
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(
+                "Ошибка при выполнении пакета", 500, {"index": index, "op": name, "error": str(e)}
+            )
+        results.append(
+            {"op": name, "status_code": status_code, "message": message, "data": result}
         )
+
+    try:
+        db.session.commit()
     except Exception as e:
         db.session.rollback()
-        return error_response("Ошибка при обновлении стадии обучения", 500, str(e))
+        return error_response("Ошибка при выполнении пакета", 500, str(e))
+    run_effects(effects)
+    return success_response("Пакет выполнен", results)
+
+
+# --------------------------
+# USER ROUTES
+# --------------------------
+@app.route("/api/user/add", methods=["POST"])
+def add_user():
+    return run_operation(
+        op_add_user, request.get_json(), "Ошибка при создании пользователя."
+    )
+
+
+@app.route("/api/user/update_training_stage", methods=["POST"])
+def update_training_stage():
+    return run_operation(
+        op_update_training_stage,
+        request.get_json(),
+        "Ошибка при обновлении стадии обучения",
+    )
 
 
 @app.route("/api/user/<int:telegram_id>/groups", methods=["GET"])
 def get_user_groups(telegram_id):
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
     try:
-        groups = (
+        limit, cursor, before = parse_page_args()
+    except ValueError:
+        return error_response("limit, cursor и before должны быть целыми числами")
+
+    try:
+        query = (
             db.session.query(Group)
             .join(UserGroup, Group.id == UserGroup.group_id)
-            .filter(UserGroup.user_id == user.id)
-            .all()
+            .filter(UserGroup.user_id == user_id)
         )
+        groups, paging = keyset_page(query, Group.id, limit, cursor, before)
         return success_response(
-            "Группы пользователя получены", group_schema.dump(groups, many=True)
+            "Группы пользователя получены",
+            group_schema.dump(groups, many=True),
+            paging=paging,
         )
     except Exception as e:
         return error_response("Ошибка при получении групп пользователя", 500, str(e))
 
 
+# Пар (группа, пользователь) в одном INSERT: 4 параметра на строку
+# укладываются в лимит 999 переменных старых сборок SQLite
+MEMBERS_BATCH_SIZE = 200
+MEMBERS_MAX_PER_REQUEST = 1000
+
+
+def add_members(group_id, user_ids):
+    """
+    Добавляет пользователей в группу, уже состоящих пропускает
+    (INSERT ... ON CONFLICT DO NOTHING). Возвращает число добавленных.
+    """
+    insert = postgresql.insert if is_postgres() else sqlite.insert
+    now = datetime.now(timezone.utc)
+    user_ids = list(user_ids)
+    added = 0
+    for start in range(0, len(user_ids), MEMBERS_BATCH_SIZE):
+        statement = (
+            insert(UserGroup)
+            .values(
+                [
+                    {"group_id": group_id, "user_id": user_id, "created_at": now, "updated_at": now}
+                    for user_id in user_ids[start:start + MEMBERS_BATCH_SIZE]
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["group_id", "user_id"])
+        )
+        added += db.session.execute(statement).rowcount
+    return added
+
+
+def remove_members(group_id, user_ids):
+    """Удаляет пользователей из группы одним DELETE, возвращает число удаленных"""
+    return UserGroup.query.filter(
+        UserGroup.group_id == group_id, UserGroup.user_id.in_(list(user_ids))
+    ).delete(synchronize_session=False)
+
+
+def members_count(group_ids):
+    """Число участников групп {group_id: count}; считается по индексу ux_user_group_group_user"""
+    if not group_ids:
+        return {}
+    rows = (
+        db.session.query(UserGroup.group_id, db.func.count())
+        .filter(UserGroup.group_id.in_(group_ids))
+        .group_by(UserGroup.group_id)
+    )
+    return dict(rows.all())
+
+
 @app.route("/api/group/<string:group_link>/join", methods=["POST"])
 def join_group(group_link):
     data = request.get_json()
@@ -262,17 +844,16 @@ def join_group(group_link):
     if not group:
         return error_response(f"Группа {group_link} не найдена", 404)
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
-    if UserGroup.query.filter_by(group_id=group.id, user_id=user.id).first():
-        return success_response("Пользователь уже в группе", 201)
-
     try:
-        new_user_group = UserGroup(group_id=group.id, user_id=user.id)
-        db.session.add(new_user_group)
+        added = add_members(group.id, [user_id])
         db.session.commit()
+        if not added:
+            return success_response("Пользователь уже в группе", 201)
+        members_version.bump()
         return success_response(f"Пользователь добавлен в группу {group.title}")
     except Exception as e:
         db.session.rollback()
@@ -287,23 +868,80 @@ def leave_group(group_id):
     if not telegram_id:
         return error_response("Требуется telegram_id пользователя")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
-    user_group = UserGroup.query.filter_by(group_id=group_id, user_id=user.id).first()
-    if not user_group:
-        return error_response("Пользователь не состоит в группе", 404)
-
     try:
-        db.session.delete(user_group)
+        if not remove_members(group_id, [user_id]):
+            db.session.rollback()
+            return error_response("Пользователь не состоит в группе", 404)
         db.session.commit()
+        members_version.bump()
         return success_response("Вы покинули группу")
     except Exception as e:
         db.session.rollback()
         return error_response("Ошибка при выходе из группы", 500, str(e))
 
 
+@app.route("/api/group/<int:group_id>/members", methods=["POST", "DELETE"])
+def group_members(group_id):
+    """
+    Массовое добавление (POST) или удаление (DELETE) участников
+    администратором группы: {"telegram_id": админ, "telegram_ids": [...]}.
+    Незарегистрированные telegram_id возвращаются в not_found.
+    """
+    data = request.get_json(silent=True) or {}
+    telegram_id = data.get("telegram_id")
+    telegram_ids = data.get("telegram_ids")
+
+    if not telegram_id:
+        return error_response("Требуется telegram_id администратора")
+    if not isinstance(telegram_ids, list) or not telegram_ids:
+        return error_response("Требуется непустой список telegram_ids")
+    if len(telegram_ids) > MEMBERS_MAX_PER_REQUEST:
+        return error_response(f"Не больше {MEMBERS_MAX_PER_REQUEST} участников за запрос")
+    try:
+        telegram_ids = {int(value) for value in telegram_ids}
+    except (TypeError, ValueError):
+        return error_response("telegram_ids должны быть целыми числами")
+
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
+        return error_response("Пользователь не найден", 404)
+
+    group = Group.query.filter_by(id=group_id, admin_user_id=user_id).first()
+    if not group:
+        return error_response("Группа не найдена или у вас нет прав", 404)
+
+    try:
+        found = dict(
+            db.session.query(User.telegram_id, User.id).filter(
+                User.telegram_id.in_(telegram_ids)
+            )
+        )
+        if request.method == "POST":
+            changed = add_members(group.id, found.values())
+            message = "Участники добавлены"
+        else:
+            changed = remove_members(group.id, found.values())
+            message = "Участники удалены"
+        db.session.commit()
+        if changed:
+            members_version.bump()
+        return success_response(
+            message,
+            {
+                "changed": changed,
+                "not_found": sorted(telegram_ids - found.keys()),
+                "members_count": members_count([group.id]).get(group.id, 0),
+            },
+        )
+    except Exception as e:
+        db.session.rollback()
+        return error_response("Ошибка при изменении участников группы", 500, str(e))
+
+
 @app.route("/api/user/<string:telegram_id>/admin-groups", methods=["GET"])
 def get_admin_groups(telegram_id):
     """
@@ -312,15 +950,17 @@ def get_admin_groups(telegram_id):
     if not telegram_id:
         return error_response("Требуется telegram_id пользователя")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
     try:
-        admin_groups = user.admin_groups
-        return success_response(
-            "Группы администратора получены", group_schema.dump(admin_groups, many=True)
-        )
+        admin_groups = Group.query.filter_by(admin_user_id=user_id).all()
+        counts = members_count([group.id for group in admin_groups])
+        result = group_schema.dump(admin_groups, many=True)
+        for group in result:
+            group["members_count"] = counts.get(group["id"], 0)
+        return success_response("Группы администратора получены", result)
     except Exception as e:
         return error_response("Ошибка при получении групп администратора", 500, str(e))
 
@@ -334,14 +974,24 @@ def create_group():
     if not all([telegram_id, title]):
         return error_response("Отсутствуют обязательные поля: telegram_id и title")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
     try:
-        group_link = generate_unique_group_code(title)
-        new_group = Group(group_link=group_link, title=title, admin_user_id=user.id)
-        db.session.add(new_group)
+        # Занятая ссылка (в том числе параллельным запросом) откатывает
+        # только точку сохранения, и пробуется следующий вариант
+        for group_link in group_link_candidates(title):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(
+                        Group(group_link=group_link, title=title, admin_user_id=user_id)
+                    )
+                break
+            except IntegrityError:
+                continue
+        else:
+            return error_response("Не удалось подобрать ссылку для группы", 409)
         db.session.commit()
         return success_response(
             f'Группа "{title}" создана успешно', {"group_link": group_link}, 201
@@ -359,17 +1009,20 @@ def delete_group(group_id):
     if not telegram_id:
         return error_response("Требуется telegram_id администратора")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
-    group = Group.query.filter_by(id=group_id, admin_user_id=user.id).first()
+    group = Group.query.filter_by(id=group_id, admin_user_id=user_id).first()
     if not group:
         return error_response("Группа не найдена или у вас нет прав", 404)
 
     try:
+        # Участников удаляем одним запросом, а не каскадом ORM по одному
+        UserGroup.query.filter_by(group_id=group.id).delete(synchronize_session=False)
         db.session.delete(group)
         db.session.commit()
+        members_version.bump()
         return success_response("Группа успешно удалена")
     except Exception as e:
         db.session.rollback()
@@ -378,85 +1031,283 @@ def delete_group(group_id):
 
 @app.route("/api/location/add", methods=["POST"])
 def add_location():
-    data = request.get_json()
-    telegram_id = data.get("telegram_id")
-    latitude = data.get("latitude")
-    longitude = data.get("longitude")
-    description = data.get("description")
+    return run_operation(
+        op_add_location, request.get_json(), "Ошибка при добавлении локации"
+    )
+
+
+# Массовый импорт: максимум строк за запрос и строк в одной транзакции
+BULK_MAX_ROWS = 50000
+BULK_BATCH_SIZE = 1000
+COPY_COLUMNS = (
+    "id", "latitude", "longitude", "description", "geohash", "user_id", "created_at", "updated_at"
+)
 
-    if not all([telegram_id, latitude, longitude, description]):
-        return error_response("Отсутствуют обязательные поля")
 
+def insert_locations(mappings):
+    """
+    Вставляет пачку локаций в текущей транзакции и проставляет в
+    mappings их id. В PostgreSQL пачка идет одним COPY, id для нее
+    заранее берутся из последовательности таблицы.
+    """
+    if not is_postgres():
+        db.session.bulk_insert_mappings(Location, mappings, return_defaults=True)
+        return
+
+    connection = db.session.connection()
+    ids = connection.execute(
+        db.text(
+            "SELECT nextval(pg_get_serial_sequence('location', 'id')) "
+            "FROM generate_series(1, :count)"
+        ),
+        {"count": len(mappings)},
+    ).scalars()
+    now = datetime.now(timezone.utc)
+    for mapping, location_id in zip(mappings, ids):
+        mapping.update(id=location_id, created_at=now, updated_at=now)
+    cursor = connection.connection.cursor()
     try:
-        latitude = float(latitude)
-        longitude = float(longitude)
-    except (TypeError, ValueError):
-        return error_response("Неверный формат координат")
+        cursor.copy_expert(
+            f"COPY location ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            bulk.copy_csv(mappings, COPY_COLUMNS),
+        )
+    finally:
+        cursor.close()
+
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+@app.route("/api/location/bulk", methods=["POST"])
+def bulk_add_locations():
+    """
+    Массовое добавление локаций: ?telegram_id=, тело — JSON-массив
+    объектов {latitude, longitude, description} или NDJSON
+    (Content-Type: application/x-ndjson). Сначала проверяются все строки,
+    при ошибках ничего не вставляется. Вставка идет пачками по
+    BULK_BATCH_SIZE, каждая в своей транзакции.
+    """
+    telegram_id = request.args.get("telegram_id")
+    if not telegram_id:
+        return error_response("Требуется telegram_id пользователя")
+
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
     try:
-        new_location = Location(
-            latitude=latitude,
-            longitude=longitude,
-            description=description,
-            user_id=user.id,
-        )
-        db.session.add(new_location)
-        db.session.commit()
-        return success_response(
-            "Локация добавлена", location_schema.dump(new_location), 201
-        )
+        if request.mimetype == "application/x-ndjson":
+            lines = (line.decode("utf-8") for line in request.stream)
+            rows = bulk.parse_ndjson(lines)
+        else:
+            rows = request.get_json(silent=True)
+            if not isinstance(rows, list):
+                raise bulk.BulkFormatError("Ожидается JSON-массив локаций")
+        mappings, errors, total = bulk.validate_rows(rows, BULK_MAX_ROWS)
+    except (bulk.BulkFormatError, UnicodeDecodeError) as e:
+        return error_response("Неверный формат данных", 400, str(e))
+    if errors:
+        return error_response("Ошибки в данных, ничего не добавлено", 400, errors)
+    if not mappings:
+        return error_response("Нет локаций для добавления")
+
+    imported = 0
+    changes = []
+    error = None
+    try:
+        for start in range(0, len(mappings), BULK_BATCH_SIZE):
+            batch = mappings[start:start + BULK_BATCH_SIZE]
+            for mapping in batch:
+                mapping["user_id"] = user_id
+                # bulk_insert_mappings не вызывает события ORM, геохэш ставим сами
+                mapping["geohash"] = spatial.encode(mapping["latitude"], mapping["longitude"])
+            insert_locations(batch)
+            batch_changes = log_location_changes("add", *(m["id"] for m in batch))
+            db.session.commit()
+            imported += len(batch)
+            changes += batch_changes
     except Exception as e:
         db.session.rollback()
-        return error_response("Ошибка при добавлении локации", 500, str(e))
+        error = e
+
+    # Уже закоммиченные пачки видны на карте даже при ошибке в следующей
+    if imported:
+        invalidate_map_caches(
+            points=[(m["latitude"], m["longitude"]) for m in mappings[:imported]]
+        )
+        publish_location_changes(changes)
+    if error is not None:
+        return error_response(
+            "Ошибка при добавлении локаций",
+            500,
+            {"error": str(error), "imported": imported, "total": total},
+        )
+    return success_response(
+        "Локации добавлены",
+        {"imported": imported, "ids": [mapping["id"] for mapping in mappings]},
+        201,
+    )
+
+
+# Точность, с которой начинается поиск ближайших: ячейка ~1.2 x 0.6 км
+NEARBY_START_PRECISION = 6
+NEARBY_MAX_LIMIT = 100
+
+
+def nearby_query(latitude, longitude, precision):
+    """
+    Точки из ячейки геохэша и ее соседей. Каждый префикс — отдельный
+    range-скан по индексу location.geohash; precision=0 — вся таблица.
+    """
+    query = map_points_query()
+    if not precision:
+        return query
+    ranges = []
+    for prefix in spatial.block(latitude, longitude, precision):
+        end = spatial.prefix_end(prefix)
+        condition = Location.geohash >= prefix
+        ranges.append(condition if end is None else db.and_(condition, Location.geohash < end))
+    return query.filter(db.or_(*ranges))
+
+
+def nearest(rows, latitude, longitude, radius=None):
+    """Сортирует точки по расстоянию, отбрасывая те, что дальше radius"""
+    result = []
+    for row in rows:
+        distance = spatial.distance_m(latitude, longitude, row.latitude, row.longitude)
+        if radius is None or distance <= radius:
+            result.append((distance, row))
+    result.sort(key=lambda item: item[0])
+    return result
+
+
+def search_radius(latitude, longitude, radius):
+    precision = spatial.precision_for_radius(latitude, radius)
+    return nearest(nearby_query(latitude, longitude, precision), latitude, longitude, radius)
+
+
+def search_nearest(latitude, longitude, limit):
+    """
+    k ближайших: укрупняем ячейку, пока в ней и соседях не наберется limit
+    точек. Расстояние до k-й из них дает радиус, точный поиск по которому
+    уже не может пропустить более близкие точки из соседних ячеек.
+    """
+    precision = NEARBY_START_PRECISION
+    while precision and nearby_query(latitude, longitude, precision).count() < limit:
+        precision -= 1
+
+    found = nearest(nearby_query(latitude, longitude, precision), latitude, longitude)
+    if not precision or len(found) < limit:
+        return found
+
+    kth_distance = found[limit - 1][0]
+    if kth_distance <= spatial.cell_size_m(latitude, precision):
+        return found
+    return search_radius(latitude, longitude, kth_distance)
+
+
+@app.route("/api/location/nearby", methods=["GET"])
+def nearby_locations():
+    """
+    Ближайшие локации: ?lat=&lon=&radius=(метры, необязательно)&limit=
+    """
+    try:
+        latitude = float(request.args["lat"])
+        longitude = float(request.args["lon"])
+        radius = request.args.get("radius")
+        radius = float(radius) if radius else None
+        limit = int(request.args.get("limit", 20))
+    except (KeyError, ValueError):
+        return error_response("Обязательные параметры: lat и lon, числа")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return error_response("Неверный формат координат")
+    if radius is not None and radius <= 0:
+        return error_response("Радиус должен быть положительным")
+    limit = min(max(limit, 1), NEARBY_MAX_LIMIT)
+
+    if radius is not None:
+        found = search_radius(latitude, longitude, radius)
+    else:
+        found = search_nearest(latitude, longitude, limit)
+
+    result = []
+    for distance, row in found[:limit]:
+        point = map_point(row)
+        point["distance"] = round(distance, 1)
+        result.append(point)
+    return success_response("Ближайшие локации получены", result)
 
 
 @app.route("/api/user/<int:telegram_id>/locations", methods=["GET"])
 def get_user_locations(telegram_id):
     """
-    Получение списка локаций пользователя
+    Получение списка локаций пользователя постранично: ?limit=&cursor=|before=
     """
-    try:
-        user = User.query.filter_by(telegram_id=telegram_id).first()
+    return run_operation(
+        op_user_locations,
+        dict(request.args, telegram_id=telegram_id),
+        "Ошибка при получении локаций",
+    )
 
-        if not user:
-            return error_response("Пользователь не найден", 404)
 
-        locations = user.locations
-        return success_response(
-            "Локации пользователя получены", location_schema.dump(locations, many=True)
+def export_response(query, filename):
+    """Потоковая выгрузка локаций в формате ?format=ndjson|csv|geojson"""
+    export_format = request.args.get("format", "ndjson")
+    exporter = bulk.EXPORTERS.get(export_format)
+    if exporter is None:
+        return error_response(
+            f"Формат должен быть одним из: {', '.join(bulk.EXPORTERS)}"
         )
-
-    except Exception as e:
-        return error_response("Ошибка при получении локаций", 500, str(e))
+    rows = query.order_by(Location.id).yield_per(MAP_STREAM_BATCH)
+    response = Response(
+        stream_with_context(bulk.coalesce(exporter(rows), MAP_STREAM_BATCH)),
+        mimetype=bulk.EXPORT_MIMETYPES[export_format],
+    )
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
 
 
-@app.route("/api/location/<int:location_id>/delete", methods=["DELETE"])
-def delete_location(location_id):
-    data = request.get_json()
-    telegram_id = data.get("telegram_id")
+def export_query():
+    return db.session.query(
+        Location.id,
+        Location.latitude,
+        Location.longitude,
+        Location.description,
+        Location.created_at,
+    )
 
-    if not telegram_id:
-        return error_response("Требуется telegram_id пользователя")
 
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
+@app.route("/api/user/<int:telegram_id>/locations/export", methods=["GET"])
+def export_user_locations(telegram_id):
+    user_id = resolve_user_id(telegram_id)
+    if user_id is None:
         return error_response("Пользователь не найден", 404)
 
-    location = Location.query.filter_by(id=location_id, user_id=user.id).first()
-    if not location:
-        return success_response("Локация не найдена, уже удалена,  или не принадлежит вам", 203)
+    query = export_query().filter(Location.user_id == user_id)
+    return export_response(query, f"locations-{telegram_id}")
 
-    try:
-        db.session.delete(location)
-        db.session.commit()
-        return success_response("Локация успешно удалена")
-    except Exception as e:
-        db.session.rollback()
-        return error_response("Ошибка при удалении локации", 500, str(e))
+
+@app.route("/api/group/<int:group_id>/locations/export", methods=["GET"])
+def export_group_locations(group_id):
+    """Локации всех участников группы"""
+    group = db.session.get(Group, group_id)
+    if not group:
+        return error_response("Группа не найдена", 404)
+
+    query = (
+        export_query()
+        .join(UserGroup, UserGroup.user_id == Location.user_id)
+        .filter(UserGroup.group_id == group_id)
+    )
+    return export_response(query, f"group-{group_id}-locations")
+
+
+@app.route("/api/location/<int:location_id>/delete", methods=["DELETE"])
+def delete_location(location_id):
+    return run_operation(
+        op_delete_location,
+        dict(request.get_json() or {}, location_id=location_id),
+        "Ошибка при удалении локации",
+    )
 
 
 # --------------------------
@@ -476,32 +1327,695 @@ def check_invite_code(invite_code):
     )
 
 
+# Максимальный зум тайлов карты (Leaflet/OSM)
+MAX_ZOOM = 19
+
+
+def map_points_query():
+    """
+    Один JOIN-запрос с проекцией только тех колонок, которые нужны карте.
+    Не поднимает ORM-объекты и не дергает ленивую связь Location.user.
+    """
+    return db.session.query(
+        Location.id,
+        Location.latitude,
+        Location.longitude,
+        Location.description,
+        User.first_name,
+        User.username,
+    ).join(User, Location.user_id == User.id)
+
+
+def map_point(row):
+    return {
+        "id": row.id,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "description": row.description,
+        "first_name": row.first_name,
+        "username": row.username,
+    }
+
+
+def parse_bbox(raw: str):
+    """
+    Разбирает bbox в формате Leaflet toBBoxString(): minLon,minLat,maxLon,maxLat.
+    Бросает ValueError при неверном формате.
+    """
+    min_lon, min_lat, max_lon, max_lat = (float(part) for part in raw.split(","))
+    if min_lat > max_lat:
+        raise ValueError("minLat больше maxLat")
+    return min_lon, max(min_lat, -90.0), max_lon, min(max_lat, 90.0)
+
+
+def bbox_lon_ranges(bbox):
+    """
+    Отрезки долготы, покрываемые bbox, или None, если долгота не ограничена.
+    Leaflet при прокрутке карты через линию перемены дат отдает долготы
+    за пределами ±180, поэтому bbox может распасться на два отрезка.
+    """
+    min_lon, _, max_lon, _ = bbox
+    if max_lon - min_lon >= 360:
+        return None
+
+    min_lon = (min_lon + 180) % 360 - 180
+    max_lon = (max_lon + 180) % 360 - 180
+    if min_lon <= max_lon:
+        return [(min_lon, max_lon)]
+    return [(min_lon, 180.0), (-180.0, max_lon)]
+
+
+def filter_bbox(query, bbox):
+    """Ограничивает запрос точками внутри bbox"""
+    _, min_lat, _, max_lat = bbox
+    lon_ranges = bbox_lon_ranges(bbox)
+    if is_postgres():
+        # Условие в форме point <@ box, чтобы сработал GiST-индекс ix_location_point
+        point = db.func.point(Location.longitude, Location.latitude)
+        return query.filter(
+            db.or_(
+                *(
+                    point.op("<@")(
+                        db.func.box(db.func.point(lo, min_lat), db.func.point(hi, max_lat))
+                    )
+                    for lo, hi in lon_ranges or [(-180.0, 180.0)]
+                )
+            )
+        )
+    query = query.filter(Location.latitude.between(min_lat, max_lat))
+    if lon_ranges is None:
+        return query
+    return query.filter(
+        db.or_(*(Location.longitude.between(lo, hi) for lo, hi in lon_ranges))
+    )
+
+
+def in_bbox(bbox, latitude, longitude):
+    _, min_lat, _, max_lat = bbox
+    if not min_lat <= latitude <= max_lat:
+        return False
+    lon_ranges = bbox_lon_ranges(bbox)
+    return lon_ranges is None or any(lo <= longitude <= hi for lo, hi in lon_ranges)
+
+
+cluster_cache = ClusterCache()
+# JSON-ответы карты: по записи на ключ, запись старой версии заменяется новой
+map_cache = PayloadCache(
+    "map-data",
+    maxsize=512,
+    maxbytes=int(os.getenv("MAP_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    redis_client=redis_client,
+    shared_ttl=600,
+    shared_max_bytes=int(os.getenv("MAP_CACHE_SHARED_MAX_BYTES", 1024 * 1024)),
+)
+# Тайлы по "z/x/y": в Redis сбрасываются точечно только тайлы с измененной точкой
+tile_cache = TileCache(
+    "tiles",
+    maxsize=4096,
+    maxbytes=int(os.getenv("TILE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    redis_client=redis_client,
+)
+
+
+# Ключ транзакционной advisory-блокировки журнала изменений в PostgreSQL
+CHANGE_LOG_LOCK_KEY = 8008
+
+
+def log_location_changes(action, *location_ids):
+    """
+    Пишет изменения точек в журнал в текущей транзакции записи.
+
+    id записи — курсор дельта-синхронизации: клиент, получивший версию N,
+    больше не спросит изменения с меньшим id. Поэтому записи журнала должны
+    становиться видны строго в порядке id. В SQLite это дает единственный
+    писатель. В PostgreSQL транзакция с id 11 могла бы закоммититься раньше
+    транзакции с id 10, и клиент пропустил бы изменение 10, поэтому запись
+    в журнал берет advisory-блокировку до конца транзакции: следующий
+    писатель получит id только после коммита предыдущего.
+    """
+    if is_postgres():
+        db.session.execute(
+            db.text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK_KEY}
+        )
+    changes = [
+        LocationChange(location_id=location_id, action=action)
+        for location_id in location_ids
+    ]
+    db.session.add_all(changes)
+    return changes
+
+
+# Больше стольких изменений за раз шлем одно событие "bulk" вместо отдельных:
+# клиент сам догонит их через дельта-синхронизацию
+PUBLISH_MAX_EVENTS = 50
+# Больше стольких точек точечная очистка тайлов дороже полной
+TILE_INVALIDATE_MAX_POINTS = 100
+
+
+def publish_location_changes(changes):
+    """Рассылает зрителям карты уже закоммиченные изменения точек"""
+    if len(changes) > PUBLISH_MAX_EVENTS:
+        event_broker.publish(
+            {"version": changes[-1].id, "action": "bulk", "count": len(changes)}
+        )
+        return
+
+    changed_ids = [change.location_id for change in changes if change.action != "delete"]
+    points = {}
+    if changed_ids:
+        query = map_points_query().filter(Location.id.in_(changed_ids))
+        points = {row.id: map_point(row) for row in query}
+
+    for change in changes:
+        event_broker.publish(
+            {
+                "version": change.id,
+                "action": change.action,
+                "id": change.location_id,
+                "location": points.get(change.location_id),
+            }
+        )
+
+
+def changes_version():
+    """Последняя версия журнала изменений (0, если журнал пуст)"""
+    return db.session.query(db.func.max(LocationChange.id)).scalar() or 0
+
+
+def invalidate_map_caches(latitude=None, longitude=None, points=None):
+    """
+    Сбрасывает в общем кэше тайлы, затронутые изменением точки, и поднимает
+    версию данных карты (это сбрасывает локальные кэши во всех воркерах).
+    points — список (latitude, longitude) при массовом изменении.
+    Без координат (например, пользователь сменил имя) или при слишком
+    большом числе точек сбрасываются все тайлы.
+    """
+    if points is None and latitude is not None:
+        points = [(latitude, longitude)]
+    tiles = None
+    if points and len(points) <= TILE_INVALIDATE_MAX_POINTS:
+        tiles = {
+            "{}/{}/{}".format(*mvt.tile_for_point(lat, lon, zoom))
+            for lat, lon in points
+            for zoom in range(MAX_ZOOM + 1)
+        }
+    # Граница тайлов ставится до подъема версии: иначе запрос новой версии
+    # успел бы принять из Redis тайл, собранный до коммита
+    version = data_version.get()
+    if version is not None:
+        tile_cache.invalidate(tiles, version + 1)
+    data_version.bump()
+
+
+def cached_json(key, build):
+    """Готовые байты JSON из кэша карты или собранные build() и закэшированные"""
+    version = g.get("map_version")
+    payload = map_cache.get(key, version)
+    if payload is None:
+        payload = app.json.dumps(build()).encode("utf-8")
+        map_cache.set(key, version, payload)
+    return Response(payload, mimetype="application/json")
+
+
+def versioned_by(get_version):
+    """
+    Условный GET для данных карты: ETag — версия данных get_version().
+    Версия читается до запроса к базе, поэтому совпавший If-None-Match
+    отвечается 304 без обращения к базе, а запись во время запроса лишь
+    приводит к лишней перезагрузке у клиента.
+    """
+    return lambda view: _versioned(view, get_version)
+
+
+def _versioned(view, get_version):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = get_version()
+        g.map_version = version
+        if version is None:
+            return view(*args, **kwargs)
+
+        etag = f"map-{version}"
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        # Браузер хранит ответ, но перепроверяет его при каждом запросе
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return wrapper
+
+
+def group_map_version():
+    """
+    Версия карты группы: меняется и с точками, и с составом групп.
+    В версию входит id группы, иначе ETag одной группы подошёл бы к другой
+    (в том числе несуществующей) и вместо 404 ушёл бы 304.
+    """
+    version = data_version.get()
+    members = members_version.get()
+    if version is None or members is None:
+        return None
+    return f"g{request.view_args['group_id']}-{version}.{members}"
+
+
+versioned = versioned_by(data_version.get)
+
+
+def build_clusters(zoom):
+    return grid_clusters(
+        db.session, Location.id, Location.latitude, Location.longitude, zoom
+    )
+
+
+def viewport_clusters(bbox, zoom):
+    """
+    Кластеры видимой области: на мелких зумах — из кэша кластеров всего
+    мира, на средних — группировкой в SQL только точек области.
+    Одиночные ячейки отдаются обычными точками, чтобы у них остался
+    попап с описанием.
+    """
+    if zoom <= WORLD_CLUSTER_MAX_ZOOM:
+        found = [
+            cluster
+            for cluster in cluster_cache.get(zoom, g.get("map_version"), build_clusters)
+            if in_bbox(bbox, cluster.latitude, cluster.longitude)
+        ]
+    else:
+        area = snap_bbox(bbox, zoom)
+        found = grid_clusters(
+            db.session,
+            Location.id,
+            Location.latitude,
+            Location.longitude,
+            zoom,
+            where=lambda query: filter_bbox(query, area),
+        )
+
+    clusters = []
+    single_ids = []
+    for cluster in found:
+        if cluster.count == 1:
+            single_ids.append(cluster.point_id)
+        else:
+            clusters.append(
+                {
+                    "latitude": cluster.latitude,
+                    "longitude": cluster.longitude,
+                    "count": cluster.count,
+                }
+            )
+
+    locations = []
+    if single_ids:
+        query = map_points_query().filter(Location.id.in_(single_ids))
+        locations = [map_point(row) for row in query]
+    return clusters, locations
+
+
+# Видимая область расширяется до ячеек сетки на столько зумов крупнее,
+# т.е. до блоков 4x4 тайла: сдвиги карты в пределах блока и соседние
+# зрители получают один и тот же ответ из кэша, а кластеры остаются целыми
+VIEWPORT_BLOCK_ZOOMS = 4
+
+
+def viewport_area(bbox, zoom):
+    """Область ответа и ключ кэша для видимой области bbox на зуме zoom"""
+    area = snap_bbox(bbox, max(zoom - VIEWPORT_BLOCK_ZOOMS, 0))
+    return area, "{}:{:.6f},{:.6f},{:.6f},{:.6f}".format(zoom, *area)
+
+
+@app.route("/api/map-data", methods=["GET"])
+@versioned
+def map_data():
+    """
+    Точки видимой области карты: ?bbox=minLon,minLat,maxLon,maxLat&zoom=z
+    Область расширяется до блоков сетки (viewport_area), поэтому в ответ
+    попадают и точки рядом с краем экрана.
+    На зуме до CLUSTER_MAX_ZOOM вместо точек отдаются кластеры.
+    """
+    try:
+        bbox = parse_bbox(request.args.get("bbox", ""))
+        zoom = int(request.args.get("zoom", MAX_ZOOM))
+    except ValueError:
+        return error_response("Параметр bbox должен быть в формате minLon,minLat,maxLon,maxLat")
+    zoom = min(max(zoom, 0), MAX_ZOOM)
+    area, key = viewport_area(bbox, zoom)
+
+    def build():
+        # Версию журнала читаем до точек: изменения между чтениями придут
+        # клиенту повторно, но не потеряются
+        version = changes_version()
+        if zoom <= CLUSTER_MAX_ZOOM:
+            clusters, result = viewport_clusters(area, zoom)
+        else:
+            clusters = []
+            result = [map_point(row) for row in filter_bbox(map_points_query(), area)]
+        return {
+            "version": version,
+            "zoom": zoom,
+            "clustered": zoom <= CLUSTER_MAX_ZOOM,
+            "clusters": clusters,
+            "locations": result,
+        }
+
+    return cached_json(key, build)
+
+
+def group_points_query(group_id):
+    """Точки участников группы одним JOIN через user_group"""
+    return (
+        map_points_query()
+        .join(UserGroup, UserGroup.user_id == Location.user_id)
+        .filter(UserGroup.group_id == group_id)
+    )
+
+
+@app.route("/api/group/<int:group_id>/map-data", methods=["GET"])
+@versioned_by(group_map_version)
+def group_map_data(group_id):
+    """
+    Точки участников группы, ответ в формате /api/map-data без кластеров.
+    ?bbox=minLon,minLat,maxLon,maxLat&zoom=z необязательны: без bbox — все
+    точки группы, с ним — точки блоков сетки вокруг него, как в /api/map-data.
+    """
+    raw_bbox = request.args.get("bbox")
+    try:
+        bbox = parse_bbox(raw_bbox) if raw_bbox else None
+        zoom = int(request.args.get("zoom", MAX_ZOOM))
+    except ValueError:
+        return error_response("Параметр bbox должен быть в формате minLon,minLat,maxLon,maxLat")
+    zoom = min(max(zoom, 0), MAX_ZOOM)
+    area, area_key = viewport_area(bbox, zoom) if bbox is not None else (None, "all")
+    if db.session.get(Group, group_id) is None:
+        return error_response("Группа не найдена", 404)
+
+    def build():
+        version = changes_version()
+        query = group_points_query(group_id)
+        if area is not None:
+            query = filter_bbox(query, area)
+        return {
+            "version": version,
+            "group_id": group_id,
+            "clustered": False,
+            "clusters": [],
+            "locations": [map_point(row) for row in query],
+        }
+
+    return cached_json(f"group:{group_id}:{area_key}", build)
+
+
+@app.route("/tiles/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+@versioned
+def map_tile(z, x, y):
+    """Точки тайла в формате Mapbox Vector Tile, слой "locations" """
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return error_response("Тайл не существует", 404)
+
+    key = f"{z}/{x}/{y}"
+    version = g.get("map_version")
+    tile = tile_cache.get(key, version)
+    if tile is None:
+        query = filter_bbox(map_points_query(), mvt.tile_bounds(z, x, y))
+        tile = mvt.encode_points(
+            "locations",
+            z,
+            x,
+            y,
+            (
+                (
+                    row.id,
+                    row.latitude,
+                    row.longitude,
+                    {
+                        "description": row.description,
+                        "first_name": row.first_name,
+                        "username": row.username,
+                    },
+                )
+                for row in query
+            ),
+        )
+        tile_cache.set(key, version, tile)
+
+    return Response(tile, mimetype=mvt.MVT_MIMETYPE)
+
+
 @app.route("/api/all-map-data", methods=["GET"])
+@versioned
 def all_map_data():
-    locations = Location.query.all()
-    result = []
     # TODO
     # т.к. логин (юзернейм может быть скрыт, то на карте нужно вывести хотябы имя, или так и написать "тебя не смогут написать...")
     # и проверку желательно на старте сделать, если у пользователя скрыт юзер нейм, то предупредить его, что написать ему не смогут,
     # предложить что-то еще
+    if request.args.get("stream"):
+        return Response(
+            stream_with_context(stream_map_points(map_points_query())),
+            mimetype="application/json",
+        )
 
-    for loc in locations:
-        result.append(
-            {
-                "latitude": loc.latitude,
-                "longitude": loc.longitude,
-                "description": loc.description,
-                "first_name": loc.user.first_name,
-                "username": loc.user.username,
-            }
+    def build():
+        version = changes_version()
+        return {
+            "version": version,
+            "locations": [map_point(row) for row in map_points_query()],
+        }
+
+    return cached_json("all", build)
+
+
+# Сколько строк за раз читается из базы и отправляется одним куском
+MAP_STREAM_BATCH = 1000
+
+
+def stream_map_points(query):
+    """
+    Тот же JSON, что и у обычного ответа, но по кускам: строки читаются
+    из базы пачками через yield_per и сразу уходят в сокет, поэтому
+    память на запрос не растет вместе с таблицей. Ответ не кэшируется.
+    """
+    version = changes_version()
+    yield '{"locations": ['
+    chunk = []
+    first = True
+    for row in query.yield_per(MAP_STREAM_BATCH):
+        chunk.append(app.json.dumps(map_point(row)))
+        if len(chunk) == MAP_STREAM_BATCH:
+            yield ("" if first else ", ") + ", ".join(chunk)
+            chunk = []
+            first = False
+    if chunk:
+        yield ("" if first else ", ") + ", ".join(chunk)
+    yield f'], "version": {version}}}'
+
+
+# Сколько изменений отдаем за раз; при большем отставании клиент перезагружает карту
+CHANGES_LIMIT = 1000
+# Сколько дней хранится журнал изменений
+CHANGES_RETENTION_DAYS = 7
+
+
+@app.route("/api/map-data/changes", methods=["GET"])
+@versioned
+def map_data_changes():
+    """
+    Изменения точек после версии since: добавленные/обновленные точки
+    и id удаленных. reset=true — клиент отстал больше, чем хранит журнал,
+    и должен загрузить карту заново.
+    """
+    try:
+        since = int(request.args["since"])
+    except (KeyError, ValueError):
+        return error_response("Требуется параметр since - версия данных клиента")
+
+    def build():
+        changes = (
+            db.session.query(LocationChange.id, LocationChange.location_id, LocationChange.action)
+            .filter(LocationChange.id > since)
+            .order_by(LocationChange.id)
+            .limit(CHANGES_LIMIT + 1)
+            .all()
+        )
+        oldest = db.session.query(db.func.min(LocationChange.id)).scalar()
+        if len(changes) > CHANGES_LIMIT or (oldest is not None and since < oldest - 1):
+            return {"version": changes_version(), "reset": True, "locations": [], "deleted": []}
+
+        # Для каждой точки важно только последнее действие
+        last_action = {}
+        for change in changes:
+            last_action[change.location_id] = change.action
+        changed_ids = [
+            location_id for location_id, action in last_action.items() if action != "delete"
+        ]
+
+        locations = []
+        if changed_ids:
+            query = map_points_query().filter(Location.id.in_(changed_ids))
+            locations = [map_point(row) for row in query]
+        # Точка могла быть удалена уже после чтения журнала
+        found = {point["id"] for point in locations}
+        deleted = [location_id for location_id in last_action if location_id not in found]
+
+        return {
+            "version": changes[-1].id if changes else since,
+            "reset": False,
+            "locations": locations,
+            "deleted": deleted,
+        }
+
+    return cached_json(f"changes:{since}", build)
+
+
+# Раз в сколько секунд слать комментарий-пинг, чтобы прокси не рвали соединение
+SSE_HEARTBEAT_SECONDS = 25
+
+
+@app.route("/api/map-data/stream", methods=["GET"])
+def map_data_stream():
+    """
+    Server-Sent Events с изменениями точек карты (event: change).
+    Держать тысячи таких подключений рассчитан gevent-воркер gunicorn
+    (см. Dockerfile); синхронный воркер занят одним зрителем целиком.
+    """
+    subscriber = event_broker.subscribe()
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    data = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if data is None:
+                    return
+                yield f"event: change\ndata: {data}\n\n"
+        finally:
+            event_broker.unsubscribe(subscriber)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    """Размер и попадания/промахи кэшей этого воркера"""
+    return jsonify(
+        {
+            "version": data_version.get(),
+            "members_version": members_version.get(),
+            "clusters": cluster_cache.stats(),
+            "map_data": map_cache.stats(),
+            "tiles": tile_cache.stats(),
+            "user_ids": user_ids.stats(),
+            "stream_subscribers": event_broker.subscribers_count(),
+        }
+    )
+
+
+def upgrade_schema():
+    """
+    create_all не трогает уже существующие таблицы, поэтому новые колонки
+    и индексы в рабочей базе досоздаем сами.
+    """
+    inspector = db.inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    for table in db.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(
+                db.text(
+                    f"ALTER TABLE {quote(table.name)} "
+                    f"ADD COLUMN {quote(column.name)} {column_type}"
+                )
+            )
+    db.session.commit()
+
+    user_group_indexes = {index["name"] for index in inspector.get_indexes("user_group")}
+    if "ux_user_group_group_user" not in user_group_indexes:
+        dedupe_memberships()
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    if is_postgres():
+        # Пространственный индекс под выборку по bbox, см. filter_bbox
+        db.session.execute(
+            db.text(
+                "CREATE INDEX IF NOT EXISTS ix_location_point "
+                "ON location USING gist (point(longitude, latitude))"
+            )
         )
+        db.session.commit()
+
+    backfill_geohash()
+    prune_location_changes()
+
 
-    return jsonify({"locations": result}), 200
+def dedupe_memberships():
+    """
+    До уникального индекса на (group_id, user_id) гонка двух вступлений
+    могла записать членство дважды: оставляем самую раннюю запись пары,
+    иначе индекс не создастся.
+    """
+    earliest = (
+        db.session.query(db.func.min(UserGroup.id))
+        .group_by(UserGroup.group_id, UserGroup.user_id)
+        .scalar_subquery()
+    )
+    UserGroup.query.filter(UserGroup.id.not_in(earliest)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def prune_location_changes():
+    """
+    Удаляет записи журнала изменений старше CHANGES_RETENTION_DAYS.
+    Последняя запись остается всегда: по ней видно, что клиент отстал.
+    """
+    threshold = datetime.now(timezone.utc) - timedelta(days=CHANGES_RETENTION_DAYS)
+    LocationChange.query.filter(
+        LocationChange.created_at < threshold, LocationChange.id < changes_version()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def backfill_geohash(batch_size=1000):
+    """Заполняет геохэш у локаций, созданных до появления колонки"""
+    while True:
+        rows = (
+            db.session.query(Location.id, Location.latitude, Location.longitude)
+            .filter(Location.geohash.is_(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return
+        db.session.bulk_update_mappings(
+            Location,
+            [
+                {"id": row.id, "geohash": spatial.encode(row.latitude, row.longitude)}
+                for row in rows
+            ],
+        )
+        db.session.commit()
 
 
 @app.before_first_request
 def create_tables():
     db.create_all()
+    upgrade_schema()
 
 
 if __name__ == "__main__":
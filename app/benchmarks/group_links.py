@@ -0,0 +1,85 @@
+# benchmarks/group_links.py
+"""
+Создание множества групп с одинаковым названием.
+
+Через тестовый клиент Flask на временной файловой SQLite создает --groups
+групп "Moscow" подряд и по каждой пятой части прогона печатает среднее
+время и число SQL-запросов на создание: подбор ссылки не должен дорожать
+с ростом числа занятых вариантов. Затем --threads потоков одновременно
+создают еще по --per-thread групп с тем же названием и считают коды ответов.
+
+    python app/benchmarks/group_links.py [--groups 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--groups", type=int, default=10000)
+    parser.add_argument("--title", default="Moscow")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="botpc-bench-"), "data.db")
+    os.environ["DATABASE_URI"] = "sqlite:///" + db_path
+    os.environ.pop("REDIS_HOST", None)
+    sys.path.insert(0, APP_DIR)
+    import app as m
+    from sqlalchemy import event
+
+    with m.app.app_context():
+        m.db.create_all()
+        m.upgrade_schema()
+        engine = m.db.engine
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        statements[0] += 1
+
+    client = m.app.test_client()
+    client.post("/api/user/add", json={"telegram_id": 1, "first_name": "Bench"})
+    body = {"telegram_id": 1, "title": args.title}
+
+    part = max(args.groups // 5, 1)
+    for start in range(0, args.groups, part):
+        end = min(start + part, args.groups)
+        statements[0] = 0
+        started = time.perf_counter()
+        for _ in range(start, end):
+            response = client.post("/api/group/create", json=body)
+            assert response.status_code == 201, response.get_json()
+        elapsed = time.perf_counter() - started
+        print(
+            f"groups {start + 1:>6}-{end:<6}: {elapsed * 1000 / (end - start):6.1f} ms/create, "
+            f"{statements[0] / (end - start):.1f} SQL/create"
+        )
+
+    codes = {}
+    lock = threading.Lock()
+
+    def create_many():
+        thread_client = m.app.test_client()
+        for _ in range(args.per_thread):
+            code = thread_client.post("/api/group/create", json=body).status_code
+            with lock:
+                codes[code] = codes.get(code, 0) + 1
+
+    threads = [threading.Thread(target=create_many) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"concurrent {args.threads} threads x {args.per_thread}: codes {codes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/nearby.py
+"""
+Поиск ближайших по геохэшу против полного перебора таблицы.
+
+Заполняет временную SQLite случайными точками по всему миру (база
+переиспользуется между запусками с тем же --points) и для случайных
+центров сравнивает медианное время и результат search_nearest /
+search_radius с перебором всех строк (nearby_query с precision=0).
+
+    python app/benchmarks/nearby.py --points 1000000 --queries 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--skip-linear", action="store_true", help="только поиск по геохэшу")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.gettempdir(), f"botpc-nearby-{args.points}.db")
+    os.environ["DATABASE_URI"] = "sqlite:///" + db_path
+    os.environ.pop("REDIS_HOST", None)
+    sys.path.insert(0, APP_DIR)
+    import app as m
+
+    if not os.path.exists(db_path):
+        with m.app.app_context():
+            m.db.create_all()
+            m.upgrade_schema()
+        connection = sqlite3.connect(db_path)
+        connection.execute('INSERT INTO "user" (id, telegram_id, training_stage) VALUES (1, 1, 0)')
+        rnd = random.Random(4)
+        batch = []
+        for _ in range(args.points):
+            lat, lon = rnd.uniform(-90, 90), rnd.uniform(-180, 180)
+            batch.append((lat, lon, "p", m.spatial.encode(lat, lon), 1))
+            if len(batch) == 100000:
+                connection.executemany(
+                    "INSERT INTO location (latitude, longitude, description, geohash, user_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+                batch = []
+        connection.executemany(
+            "INSERT INTO location (latitude, longitude, description, geohash, user_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            batch,
+        )
+        connection.commit()
+        connection.close()
+
+    rnd = random.Random(7)
+    centers = [(rnd.uniform(-80, 80), rnd.uniform(-180, 180)) for _ in range(args.queries)]
+
+    def bench(search):
+        times, results = [], []
+        for lat, lon in centers:
+            started = time.perf_counter()
+            results.append(search(lat, lon))
+            times.append(time.perf_counter() - started)
+        return statistics.median(times) * 1000, results
+
+    def linear(lat, lon, radius=None):
+        return m.nearest(m.nearby_query(lat, lon, 0), lat, lon, radius)
+
+    cases = [
+        ("k=20 nearest", lambda lat, lon: m.search_nearest(lat, lon, 20)[:20],
+         lambda lat, lon: linear(lat, lon)[:20]),
+        ("radius 10 km", lambda lat, lon: m.search_radius(lat, lon, 10000),
+         lambda lat, lon: linear(lat, lon, 10000)),
+        ("radius 100 km", lambda lat, lon: m.search_radius(lat, lon, 100000),
+         lambda lat, lon: linear(lat, lon, 100000)),
+    ]
+    with m.app.app_context():
+        m.db.session.execute(m.db.text("SELECT count(*) FROM location")).scalar()
+        for name, indexed, scan in cases:
+            indexed_ms, indexed_results = bench(indexed)
+            line = f"{args.points:>8} {name:14}: geohash {indexed_ms:8.2f} ms"
+            if not args.skip_linear:
+                scan_ms, scan_results = bench(scan)
+                same = all(
+                    [row.id for _, row in a] == [row.id for _, row in b]
+                    for a, b in zip(indexed_results, scan_results)
+                )
+                line += f", linear scan {scan_ms:9.1f} ms, same result {same}"
+            print(line)
+
+        # Нижняя граница перебора: k ближайших по плоскому расстоянию целиком в SQL
+        sql = m.db.text(
+            "SELECT id FROM location ORDER BY (latitude - :lat) * (latitude - :lat)"
+            " + (longitude - :lon) * (longitude - :lon) LIMIT 20"
+        )
+        scan_ms, _ = bench(lambda lat, lon: m.db.session.execute(sql, {"lat": lat, "lon": lon}).all())
+        print(f"{args.points:>8} SQL-only planar k=20 scan: {scan_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/write_contention.py
+"""
+Конкурентная запись в SQLite под gunicorn с gevent-воркерами.
+
+Поднимает gunicorn на временной базе, подключает зрителей SSE
+(/api/map-data/stream) и параллельно пишет точки из нескольких процессов.
+Отдельный поток все это время дергает легкий GET /api/cache/stats:
+если ожидание блокировки базы замораживает воркер, это видно по хвосту
+задержек этого запроса и по задержке доставки событий SSE.
+
+    python app/benchmarks/write_contention.py [--app-dir app] [--sse 40]
+
+--hold-ms N каждые --hold-every секунд держит блокировку записи N мс из
+отдельного соединения, как долгая транзакция записи (пачка массового
+импорта, обслуживание базы): остальные писатели в это время ждут.
+
+Без Redis события SSE доходят только до зрителей того же воркера, что и
+запись, поэтому число полученных событий меньше writers * writes.
+"""
+import argparse
+import http.client
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from multiprocessing import Pool
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def request(base, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data, {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return -1
+
+
+def write_points(args):
+    base, number, count = args
+    latencies, codes = [], {}
+    for index in range(count):
+        started = time.perf_counter()
+        # В описании — момент отправки, по нему зрители SSE считают задержку
+        code = request(
+            base,
+            "/api/location/add",
+            {
+                "telegram_id": 1,
+                "latitude": 50 + number + index / 1000,
+                "longitude": 30,
+                "description": f"{started:.6f}",
+            },
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+        codes[code] = codes.get(code, 0) + 1
+    return latencies, codes
+
+
+def watch_stream(port, delays, stop):
+    """Зритель SSE: задержка от отправки записи до получения события"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    connection.request("GET", "/api/map-data/stream")
+    response = connection.getresponse()
+    while not stop.is_set():
+        line = response.readline()
+        if not line:
+            return
+        if line.startswith(b"data: "):
+            received = time.perf_counter()
+            location = json.loads(line[6:]).get("location") or {}
+            try:
+                delays.append((received - float(location.get("description"))) * 1000)
+            except (TypeError, ValueError):
+                pass
+
+
+def hold_write_lock(db_path, hold_ms, every, stop):
+    connection = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+    while not stop.wait(every):
+        connection.execute("BEGIN IMMEDIATE")
+        time.sleep(hold_ms / 1000)
+        connection.execute("COMMIT")
+    connection.close()
+
+
+def probe(base, latencies, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        request(base, "/api/cache/stats")
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.02)
+
+
+def summary(name, values):
+    if len(values) < 2:
+        return f"{name}: n={len(values)}"
+    values = sorted(values)
+    q = statistics.quantiles(values, n=100)
+    return f"{name}: n={len(values)} p50={q[49]:.1f}ms p99={q[98]:.1f}ms max={values[-1]:.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--app-dir", default=APP_DIR)
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=150, help="записей на писателя")
+    parser.add_argument("--sse", type=int, default=40, help="подключенных зрителей SSE")
+    parser.add_argument("--seed", type=int, default=30000, help="точек в базе до начала")
+    parser.add_argument("--hold-ms", type=int, default=0, help="длительность долгой записи")
+    parser.add_argument("--hold-every", type=float, default=1.0)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="botpc-bench-"), "data.db")
+    env = dict(os.environ, DATABASE_URI="sqlite:///" + db_path)
+    env.pop("REDIS_HOST", None)
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "--workers", str(args.workers),
+            "--worker-class", "gevent",
+            "--worker-connections", "2000",
+            "--bind", f"127.0.0.1:{args.port}",
+            "app:app",
+        ],
+        cwd=args.app_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        for _ in range(100):
+            if request(base, "/api/cache/stats") == 200:
+                break
+            time.sleep(0.1)
+        request(base, "/api/user/add", {"telegram_id": 1, "first_name": "Bench"})
+        connection = sqlite3.connect(db_path)
+        connection.executemany(
+            "INSERT INTO location (latitude, longitude, description, user_id, geohash) "
+            "VALUES (?, ?, 'seed', 1, 'x')",
+            ((number % 80, number % 170) for number in range(args.seed)),
+        )
+        connection.commit()
+        connection.close()
+
+        stop = threading.Event()
+        sse_delays, probe_latencies = [], []
+        threads = [
+            threading.Thread(target=watch_stream, args=(args.port, sse_delays, stop), daemon=True)
+            for _ in range(args.sse)
+        ]
+        threads.append(threading.Thread(target=probe, args=(base, probe_latencies, stop), daemon=True))
+        if args.hold_ms:
+            threads.append(
+                threading.Thread(
+                    target=hold_write_lock,
+                    args=(db_path, args.hold_ms, args.hold_every, stop),
+                    daemon=True,
+                )
+            )
+        for thread in threads:
+            thread.start()
+        time.sleep(1)
+
+        started = time.time()
+        with Pool(args.writers) as pool:
+            results = pool.map(
+                write_points, [(base, number, args.writes) for number in range(args.writers)]
+            )
+        elapsed = time.time() - started
+        time.sleep(1)
+        stop.set()
+
+        latencies = [value for result in results for value in result[0]]
+        codes = {}
+        for result in results:
+            for code, count in result[1].items():
+                codes[code] = codes.get(code, 0) + count
+        print(f"{summary('writes', latencies)} rps={len(latencies) / elapsed:.0f} codes={codes}")
+        print(summary("probe GET /api/cache/stats", probe_latencies))
+        print(summary(f"SSE delivery ({args.sse} clients)", sse_delays))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
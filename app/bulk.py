@@ -0,0 +1,170 @@
+# bulk.py
+"""
+Разбор и проверка массового импорта локаций и форматы потокового экспорта.
+
+Импорт принимает JSON-массив или NDJSON (по объекту на строку). Все строки
+проверяются за один проход до вставки: клиент сразу получает полный список
+ошибок с номерами строк, а не первую из них.
+"""
+import csv
+import io
+import json
+
+# Ограничение длины описания — как у колонки Location.description
+DESCRIPTION_MAX_LENGTH = 120
+# Сколько ошибок возвращаем клиенту, остальные только считаем
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_FIELDS = ("id", "latitude", "longitude", "description", "created_at")
+EXPORT_MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "geojson": "application/geo+json",
+}
+
+
+class BulkFormatError(ValueError):
+    """Тело запроса не разбирается как JSON-массив или NDJSON"""
+
+
+def parse_ndjson(lines):
+    """Объекты из NDJSON, пустые строки пропускаются"""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise BulkFormatError(f"Строка {number}: неверный JSON ({e})")
+
+
+def _coordinate(value, limit):
+    # bool — подкласс int, но координатой не является
+    if isinstance(value, bool):
+        raise ValueError
+    value = float(value)
+    if not -limit <= value <= limit:
+        raise ValueError
+    return value
+
+
+def validate_rows(rows, max_rows: int):
+    """
+    Проверяет строки импорта. Возвращает (mappings, errors, total):
+    mappings — готовые к вставке словари, errors — до MAX_REPORTED_ERRORS
+    ошибок вида {"row": номер с 1, "error": текст}.
+    """
+    mappings = []
+    errors = []
+    total = 0
+    error_count = 0
+
+    def fail(number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": number, "error": message})
+
+    for number, row in enumerate(rows, start=1):
+        total = number
+        if number > max_rows:
+            raise BulkFormatError(f"Не больше {max_rows} локаций за один импорт")
+        if not isinstance(row, dict):
+            fail(number, "Ожидается объект")
+            continue
+        try:
+            latitude = _coordinate(row.get("latitude"), 90)
+            longitude = _coordinate(row.get("longitude"), 180)
+        except (TypeError, ValueError):
+            fail(number, "Неверный формат координат")
+            continue
+        description = row.get("description")
+        if not isinstance(description, str) or not description.strip():
+            fail(number, "Отсутствует описание")
+            continue
+        if len(description) > DESCRIPTION_MAX_LENGTH:
+            fail(number, f"Описание длиннее {DESCRIPTION_MAX_LENGTH} символов")
+            continue
+        mappings.append(
+            {"latitude": latitude, "longitude": longitude, "description": description}
+        )
+
+    if error_count > len(errors):
+        errors.append({"row": None, "error": f"И еще ошибок: {error_count - len(errors)}"})
+    return mappings, errors, total
+
+
+def _export_record(row):
+    record = {field: getattr(row, field) for field in EXPORT_FIELDS}
+    if record["created_at"] is not None:
+        record["created_at"] = record["created_at"].isoformat()
+    return record
+
+
+def export_ndjson(rows):
+    for row in rows:
+        yield json.dumps(_export_record(row), ensure_ascii=False) + "\n"
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        record = _export_record(row)
+        writer.writerow([record[field] for field in EXPORT_FIELDS])
+        # Отдаем накопленное, чтобы буфер не рос вместе с выгрузкой
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_geojson(rows):
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ""
+    for row in rows:
+        record = _export_record(row)
+        feature = {
+            "type": "Feature",
+            # GeoJSON: порядок координат — долгота, широта
+            "geometry": {
+                "type": "Point",
+                "coordinates": [record.pop("longitude"), record.pop("latitude")],
+            },
+            "properties": record,
+        }
+        yield separator + json.dumps(feature, ensure_ascii=False)
+        separator = ", "
+    yield "]}"
+
+
+EXPORTERS = {
+    "ndjson": export_ndjson,
+    "csv": export_csv,
+    "geojson": export_geojson,
+}
+
+
+def coalesce(chunks, size: int):
+    """Склеивает мелкие куски потока по size штук, чтобы не писать в сокет построчно"""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def copy_csv(mappings, columns):
+    """Буфер CSV для COPY ... FROM STDIN WITH (FORMAT csv): None пишется как NULL"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for mapping in mappings:
+        writer.writerow([mapping[column] for column in columns])
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,314 @@
+# cache.py
+"""
+Кэши уже сериализованных ответов карты и версия данных для их инвалидации.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+def connect_redis(host: str, port: int = 6379):
+    """Клиент Redis или None, если Redis не настроен или не установлен"""
+    if not host:
+        return None
+    if redis is None:
+        logger.warning("REDIS_HOST задан, но пакет redis не установлен")
+        return None
+    # Короткий таймаут: без Redis карта должна работать, а не висеть
+    return redis.Redis(host=host, port=port, socket_timeout=1, socket_connect_timeout=1)
+
+
+class LRUCache:
+    """
+    Ограниченный по числу записей (и, если задан maxbytes, по суммарному
+    размеру) LRU-кэш с временем жизни записей, безопасный для потоков
+    одного процесса. Считает попадания и промахи.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None, maxbytes: int = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, accept=None):
+        """
+        Значение или None. accept(value) — дополнительная проверка записи:
+        отвергнутая запись считается промахом, но остается до замены через set()
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl is not None and now - item[0] >= self.ttl:
+                self._pop(key)
+                item = None
+            if item is not None and (accept is None or accept(item[1])):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, nbytes: int = 0):
+        """nbytes — размер значения для ограничения maxbytes"""
+        with self._lock:
+            self._pop(key)
+            # Значение больше всего кэша не вытесняет остальные записи
+            if self.maxbytes is not None and nbytes > self.maxbytes:
+                return
+            self._data[key] = (time.monotonic(), value, nbytes)
+            self.nbytes += nbytes
+            while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes
+            ):
+                self.nbytes -= self._data.popitem(last=False)[1][2]
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.nbytes -= item[2]
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 3) if requests else None,
+            }
+
+
+class PayloadCache:
+    """
+    Двухуровневый кэш готовых байтов ответа.
+
+    На ключ хранится одна запись вместе с версией данных карты, при которой
+    она собрана; запись другой версии считается промахом и заменяется
+    следующим set(). Поэтому после записи воркеры перестают отдавать старые
+    ответы без рассылки инвалидаций, а устаревшие копии не копятся.
+    Первый уровень — LRU в памяти воркера, ограниченный и числом записей,
+    и суммарным размером. Второй — общий Redis (если настроен); ответы
+    больше shared_max_bytes в него не кладутся: гонять многомегабайтные
+    значения по сети на каждой смене версии дороже, чем собрать их заново.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        maxbytes: int,
+        redis_client=None,
+        shared_ttl: int = 3600,
+        shared_max_bytes: int = 1024 * 1024,
+    ):
+        self.name = name
+        self.local = LRUCache(maxsize, maxbytes=maxbytes)
+        self.redis = redis_client
+        self.shared_ttl = shared_ttl
+        self.shared_max_bytes = shared_max_bytes
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def _shared_key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    @staticmethod
+    def _pack(version, payload: bytes) -> bytes:
+        return str(version).encode() + b"\n" + payload
+
+    @staticmethod
+    def _unpack(raw: bytes):
+        version, _, payload = raw.partition(b"\n")
+        return version.decode(), payload
+
+    def _read_shared(self, key: str):
+        """Запись общего уровня и данные для ее проверки в _accept_shared()"""
+        return self.redis.get(self._shared_key(key)), None
+
+    def _accept_shared(self, stored_version: str, version, extra) -> bool:
+        """Годится ли запись общего уровня для текущей версии"""
+        return stored_version == str(version)
+
+    def get(self, key: str, version):
+        """Байты ответа или None. version=None — кэш не используется"""
+        if version is None:
+            return None
+        item = self.local.get(key, accept=lambda item: item[0] == version)
+        if item is not None:
+            return item[1]
+        if self.redis is None:
+            return None
+
+        try:
+            raw, extra = self._read_shared(key)
+        except redis.RedisError as e:
+            logger.warning(f"Кэш {self.name}: Redis недоступен: {e}")
+            return None
+        if raw is not None:
+            stored_version, payload = self._unpack(raw)
+            if self._accept_shared(stored_version, version, extra):
+                self.shared_hits += 1
+                self.local.set(key, (version, payload), len(payload))
+                return payload
+        self.shared_misses += 1
+        return None
+
+    def set(self, key: str, version, payload: bytes):
+        if version is None:
+            return
+        self.local.set(key, (version, payload), len(payload))
+        if self.redis is None or len(payload) > self.shared_max_bytes:
+            return
+        try:
+            self.redis.set(
+                self._shared_key(key), self._pack(version, payload), ex=self.shared_ttl
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Кэш {self.name}: Redis недоступен: {e}")
+
+    def clear(self):
+        self.local.clear()
+        if self.redis is None:
+            return
+        try:
+            keys = list(self.redis.scan_iter(self._shared_key("*"), count=1000))
+            if keys:
+                self.redis.delete(*keys)
+        except redis.RedisError as e:
+            logger.error(f"Кэш {self.name}: не удалось очистить: {e}")
+
+    def stats(self):
+        stats = self.local.stats()
+        if self.redis is not None:
+            stats["shared_hits"] = self.shared_hits
+            stats["shared_misses"] = self.shared_misses
+        return stats
+
+
+class TileCache(PayloadCache):
+    """
+    Кэш тайлов с целыми растущими версиями. Запись карты меняет лишь
+    несколько тайлов, поэтому общий уровень отдает и тайлы, собранные при
+    более старой версии, если их не коснулись изменения. invalidate()
+    ставит затронутым тайлам нижнюю границу версии, и записи старше нее
+    отвергаются — в том числе тайл, который запрос, прочитавший точки до
+    коммита, положит в Redis уже после инвалидации.
+    """
+
+    # Граница хранится счетом единственного элемента sorted set: ZADD GT
+    # только повышает ее, и параллельные записи не опустят границу друг друга
+    FLOOR_MEMBER = "floor"
+
+    def _floor_key(self, key: str = None) -> str:
+        if key is None:
+            return f"cache:{self.name}:floor"
+        return f"cache:{self.name}:floor:{key}"
+
+    def _read_shared(self, key: str):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self._shared_key(key))
+        pipe.zscore(self._floor_key(key), self.FLOOR_MEMBER)
+        pipe.zscore(self._floor_key(), self.FLOOR_MEMBER)
+        raw, *floors = pipe.execute()
+        return raw, max((floor for floor in floors if floor is not None), default=0)
+
+    def _accept_shared(self, stored_version: str, version, floor) -> bool:
+        return int(stored_version) >= floor
+
+    def invalidate(self, keys, floor: int):
+        """
+        Отвергает тайлы keys (None — все тайлы) версий меньше floor.
+        Вызывается после коммита и до подъема версии данных, с floor на
+        единицу больше текущей версии: запросы новой версии читают точки
+        уже после коммита, а более старые ответы не пройдут границу.
+        """
+        if self.redis is None:
+            return
+        # Граница живет дольше любой записи, которую она должна отвергать
+        ttl = self.shared_ttl * 2
+        floor_keys = [self._floor_key()] if keys is None else [self._floor_key(key) for key in keys]
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for floor_key in floor_keys:
+                pipe.zadd(floor_key, {self.FLOOR_MEMBER: floor}, gt=True)
+                pipe.expire(floor_key, ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Кэш {self.name}: не удалось сбросить тайлы: {e}")
+
+
+class DataVersion:
+    """
+    Монотонно растущая версия данных карты. Меняется при любой записи,
+    которая влияет на карту, и служит ETag для ответов.
+
+    С Redis версия общая для всех воркеров gunicorn и всех инстансов.
+    Без Redis счетчик живет в памяти процесса — годится только для
+    запуска в один воркер (локальная разработка).
+
+    Отсчет начинается с текущего времени в миллисекундах, а не с нуля:
+    после рестарта процесса или очистки Redis версия не повторит старую,
+    и клиент не получит 304 на устаревшие данные.
+    """
+
+    KEY = "map:version"
+
+    def __init__(self, redis_client=None, key: str = KEY):
+        self.redis = redis_client
+        self.key = key
+        self._lock = threading.Lock()
+        self._local = self._seed()
+
+    @staticmethod
+    def _seed():
+        return int(time.time() * 1000)
+
+    def get(self):
+        """Текущая версия или None, если хранилище версии недоступно"""
+        if self.redis is None:
+            return self._local
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(self.key, self._seed(), nx=True)
+            pipe.get(self.key)
+            return int(pipe.execute()[1])
+        except redis.RedisError as e:
+            logger.warning(f"Не удалось получить версию данных карты: {e}")
+            return None
+
+    def bump(self):
+        if self.redis is None:
+            with self._lock:
+                self._local += 1
+                return self._local
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(self.key, self._seed(), nx=True)
+            pipe.incr(self.key)
+            return pipe.execute()[1]
+        except redis.RedisError as e:
+            logger.error(f"Не удалось обновить версию данных карты: {e}")
+            return None
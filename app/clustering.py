@@ -0,0 +1,119 @@
+# clustering.py
+"""
+Сеточная кластеризация точек карты на мелких масштабах.
+
+Точки группируются в ячейки сетки прямо в SQL (GROUP BY по номеру ячейки),
+поэтому в память попадают только центроиды кластеров, а не вся таблица.
+На самых мелких зумах ячеек немного, и кластеры всего мира кэшируются по
+зуму до смены версии данных. На средних зумах ячеек почти столько же,
+сколько точек, поэтому группируется только видимая область: запрос
+сначала ограничивается bbox по индексу, затем GROUP BY.
+"""
+import math
+import threading
+from collections import namedtuple
+
+from sqlalchemy import Integer, cast, func
+
+# До какого зума включительно вместо отдельных точек отдаем кластеры
+CLUSTER_MAX_ZOOM = 13
+# До какого зума кластеры считаются на весь мир и кэшируются целиком:
+# на 6-м зуме это не больше 256 x 128 ячеек
+WORLD_CLUSTER_MAX_ZOOM = 6
+# Ячеек сетки на сторону тайла 256px, т.е. одна ячейка ~64px на экране
+CELLS_PER_TILE = 4
+
+Cluster = namedtuple("Cluster", "latitude longitude count point_id")
+
+
+def cell_size(zoom: int) -> float:
+    """Размер ячейки сетки в градусах для данного зума"""
+    return 360.0 / (2**zoom * CELLS_PER_TILE)
+
+
+def snap_bbox(bbox, zoom: int):
+    """
+    Расширяет bbox (minLon, minLat, maxLon, maxLat) до границ ячеек
+    сетки зума, чтобы крайние ячейки видимой области считались целиком
+    и кластер не менял счетчик при сдвиге карты.
+    """
+    size = cell_size(zoom)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return (
+        math.floor(min_lon / size) * size,
+        max(math.floor(min_lat / size) * size, -90.0),
+        math.ceil(max_lon / size) * size,
+        min(math.ceil(max_lat / size) * size, 90.0),
+    )
+
+
+def grid_clusters(session, id_column, latitude, longitude, zoom: int, where=None):
+    """
+    Группирует точки по ячейкам сетки зума одним запросом.
+    where(query) — ограничение выборки до группировки (видимая область),
+    без него группируются все точки. Для одиночных ячеек point_id
+    указывает на саму точку.
+    """
+    size = cell_size(zoom)
+    to_cell = _cell_index(session.connection().dialect.name)
+    cell_x = to_cell((longitude + 180) / size)
+    cell_y = to_cell((latitude + 90) / size)
+
+    query = session.query(
+        func.avg(latitude),
+        func.avg(longitude),
+        func.count(id_column),
+        func.min(id_column),
+    )
+    if where is not None:
+        query = where(query)
+    rows = query.group_by(cell_x, cell_y).all()
+    return [Cluster(lat, lon, count, point_id) for lat, lon, count, point_id in rows]
+
+
+def _cell_index(dialect_name: str):
+    """
+    Номер ячейки из неотрицательной координаты (после сдвига на +180/+90).
+    В SQLite CAST к целому отбрасывает дробную часть, т.е. здесь работает
+    как floor, а функции floor в старых сборках SQLite нет. PostgreSQL
+    при CAST округляет, и ячейки сдвинулись бы на полячейки — там floor.
+    """
+    if dialect_name == "sqlite":
+        return lambda value: cast(value, Integer)
+    return func.floor
+
+
+class ClusterCache:
+    """
+    Кэш кластеров всего мира по зуму, общий для потоков процесса.
+    Запись годится, пока не сменилась версия данных карты, поэтому
+    воркеры не нуждаются в явной инвалидации друг от друга.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._by_zoom = {}
+
+    def get(self, zoom: int, version, build):
+        """version=None (версия недоступна) — строим без кэширования"""
+        with self._lock:
+            cached = self._by_zoom.get(zoom)
+            if version is not None and cached and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        clusters = build(zoom)
+        if version is not None:
+            with self._lock:
+                # Параллельный запрос мог уже положить кластеры более новой версии
+                cached = self._by_zoom.get(zoom)
+                if not cached or cached[0] < version:
+                    self._by_zoom[zoom] = (version, clusters)
+        return clusters
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._by_zoom), "hits": self.hits, "misses": self.misses}
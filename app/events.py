@@ -0,0 +1,97 @@
+# events.py
+"""
+Рассылка событий изменения точек карты подписчикам SSE.
+
+События публикуются в канал Redis, поэтому их видят все воркеры gunicorn
+и все инстансы приложения. В каждом процессе канал слушает один фоновый
+поток, который раскладывает события по очередям подключенных клиентов:
+сколько бы зрителей ни было открыто, к Redis у процесса одно подключение.
+Без Redis события расходятся только внутри процесса.
+
+Примитивы здесь обычные threading/queue: под gevent-воркером gunicorn
+они пропатчены и становятся гринлетами, поэтому тысячи простаивающих
+подключений почти ничего не стоят.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Сколько событий может ждать медленный клиент, прежде чем его отключат
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class EventBroker:
+    def __init__(self, redis_client=None, channel: str = "map:events"):
+        self.redis = redis_client
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._listener = None
+
+    def publish(self, event: dict):
+        data = json.dumps(event, ensure_ascii=False)
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.channel, data)
+                return
+            except redis.RedisError as e:
+                logger.error(f"Не удалось опубликовать событие карты: {e}")
+        self._fanout(data)
+
+    def subscribe(self) -> queue.Queue:
+        """Очередь событий для одного клиента; None в очереди — конец потока"""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self.redis is not None and self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="map-events", daemon=True
+                )
+                self._listener.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscribers_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _fanout(self, data: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(data)
+            except queue.Full:
+                # Клиент не успевает читать: закрываем поток, после
+                # переподключения он догонит изменения через дельта-синхронизацию
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                while True:
+                    message = pubsub.get_message(timeout=30)
+                    if message and message["type"] == "message":
+                        self._fanout(message["data"].decode("utf-8"))
+            except redis.RedisError as e:
+                logger.error(f"Подписка на события карты прервалась: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
@@ -0,0 +1,118 @@
+# mvt.py
+"""
+Кодирование точек в Mapbox Vector Tile (protobuf) и математика тайлов
+Web Mercator. Нужны только точки, поэтому вместо зависимости от
+protobuf-библиотек здесь минимальный энкодер под спецификацию MVT 2.1.
+"""
+import math
+
+MVT_MIMETYPE = "application/vnd.mapbox-vector-tile"
+EXTENT = 4096
+# Предел широты проекции Web Mercator
+MAX_LATITUDE = 85.0511287798
+
+_WIRE_VARINT = 0
+_WIRE_BYTES = 2
+_GEOM_POINT = 1
+_CMD_MOVE_TO_ONE = (1 << 3) | 1
+
+
+def _mercator(latitude: float, longitude: float, zoom: int):
+    """Координаты точки в тайлах (дробные) на данном зуме"""
+    n = 2**zoom
+    latitude = max(min(latitude, MAX_LATITUDE), -MAX_LATITUDE)
+    lat_rad = math.radians(latitude)
+    x = (longitude + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_for_point(latitude: float, longitude: float, zoom: int):
+    n = 2**zoom
+    x, y = _mercator(latitude, longitude, zoom)
+    return zoom, min(int(x), n - 1), min(int(y), n - 1)
+
+
+def tile_bounds(zoom: int, x: int, y: int):
+    """bbox тайла в формате minLon,minLat,maxLon,maxLat"""
+    n = 2**zoom
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (
+        x / n * 360.0 - 180.0,
+        latitude(y + 1),
+        (x + 1) / n * 360.0 - 180.0,
+        latitude(y),
+    )
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint((field << 3) | _WIRE_VARINT) + _varint(value)
+
+
+def _field_bytes(field: int, value: bytes) -> bytes:
+    return _varint((field << 3) | _WIRE_BYTES) + _varint(len(value)) + value
+
+
+def _packed(field: int, values) -> bytes:
+    return _field_bytes(field, b"".join(_varint(value) for value in values))
+
+
+def encode_points(layer_name: str, zoom: int, x: int, y: int, points) -> bytes:
+    """
+    Кодирует тайл с одним слоем точек.
+    points: итерируемое из (id, latitude, longitude, properties: dict).
+    Значения свойств кодируются строками, None пропускается.
+    """
+    keys = {}
+    values = {}
+    features = []
+    for point_id, latitude, longitude, properties in points:
+        px, py = _mercator(latitude, longitude, zoom)
+        px = int(round((px - x) * EXTENT))
+        py = int(round((py - y) * EXTENT))
+
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            value = str(value)
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(value, len(values)))
+
+        features.append(
+            _field_bytes(
+                2,
+                _field_varint(1, point_id)
+                + _packed(2, tags)
+                + _field_varint(3, _GEOM_POINT)
+                + _packed(4, (_CMD_MOVE_TO_ONE, _zigzag(px), _zigzag(py))),
+            )
+        )
+
+    layer = (
+        _field_varint(15, 2)
+        + _field_bytes(1, layer_name.encode("utf-8"))
+        + b"".join(features)
+        + b"".join(_field_bytes(3, key.encode("utf-8")) for key in keys)
+        + b"".join(
+            _field_bytes(4, _field_bytes(1, value.encode("utf-8"))) for value in values
+        )
+        + _field_varint(5, EXTENT)
+    )
+    return _field_bytes(3, layer)
@@ -0,0 +1,118 @@
+# spatial.py
+"""
+Геохэш и расстояния для пространственного поиска по локациям.
+
+Геохэш точки хранится в колонке Location.geohash. Ячейки с общим префиксом
+лежат рядом, поэтому поиск соседей сводится к нескольким range-сканам
+по индексу этой колонки: ячейка с точкой и восемь соседних.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Точность хранимого геохэша: ячейка ~5 x 5 метров
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int):
+    """Размер ячейки геохэша в градусах: (по широте, по долготе)"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lon_bits
+
+
+def cell_size_m(latitude: float, precision: int) -> float:
+    """Меньшая из сторон ячейки на данной широте, в метрах"""
+    lat_deg, lon_deg = cell_size(precision)
+    lon_m = lon_deg * METERS_PER_DEGREE * math.cos(math.radians(latitude))
+    return min(lat_deg * METERS_PER_DEGREE, lon_m)
+
+
+def block(latitude: float, longitude: float, precision: int):
+    """
+    Префиксы ячейки с точкой и ее соседей. Любая точка ближе cell_size_m
+    к исходной гарантированно попадает в один из них.
+    """
+    lat_deg, lon_deg = cell_size(precision)
+    prefixes = set()
+    for d_lat in (-lat_deg, 0, lat_deg):
+        lat = latitude + d_lat
+        if not -90 <= lat <= 90:
+            continue
+        for d_lon in (-lon_deg, 0, lon_deg):
+            lon = (longitude + d_lon + 180) % 360 - 180
+            prefixes.add(encode(lat, lon, precision))
+    return sorted(prefixes)
+
+
+def prefix_end(prefix: str):
+    """
+    Верхняя граница диапазона геохэшей с префиксом prefix: первый префикс
+    той же длины или короче, идущий после всех них, или None, если prefix
+    целиком из "z" и граница не нужна. Граница строится из символов самого
+    алфавита, а цифры и строчные латинские буквы упорядочены одинаково и
+    побайтно, и в обычных сортировках (collation) PostgreSQL, в отличие
+    от служебного символа вроде "{".
+    """
+    stripped = prefix.rstrip(BASE32[-1])
+    if not stripped:
+        return None
+    return stripped[:-1] + BASE32[BASE32.index(stripped[-1]) + 1]
+
+
+def precision_for_radius(latitude: float, radius_m: float) -> int:
+    """
+    Наибольшая точность, при которой ячейка не меньше радиуса поиска,
+    или 0, если радиус не покрыть соседними ячейками (ищем по всей таблице).
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if cell_size_m(latitude, precision) >= radius_m:
+            return precision
+    return 0
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние по большому кругу (формула гаверсинусов)"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
@@ -0,0 +1,68 @@
+# sqlite_retry.py
+"""
+Ожидание блокировки записи SQLite без остановки gevent-воркера.
+
+busy_timeout ждет освобождения базы внутри C-кода SQLite, и gevent не может
+переключиться на другие гринлеты: ждущий писатель замораживает весь воркер
+вместе с его SSE-потоками и остальными запросами. Под gevent busy_timeout
+делается коротким, а занятую базу соединение ждет само: повторяет оператор,
+засыпая между попытками через gevent.sleep.
+"""
+import sqlite3
+import time
+
+# Базовый и расширенный коды "база занята", при которых повтор помогает.
+# SQLITE_BUSY_SNAPSHOT (517) не повторяем: снимок транзакции устарел,
+# и оператор не пройдет, пока транзакцию не начнут заново
+SQLITE_BUSY = 5
+SQLITE_BUSY_RECOVERY = 261
+# Паузы между попытками растут от первой до последней
+FIRST_DELAY = 0.002
+MAX_DELAY = 0.05
+
+
+def is_busy(error: sqlite3.OperationalError) -> bool:
+    # Код ошибки у исключения есть с Python 3.11, раньше — только текст
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is None:
+        return "database is locked" in str(error)
+    return code in (SQLITE_BUSY, SQLITE_BUSY_RECOVERY)
+
+
+def retry_busy(call, timeout: float, sleep):
+    """Вызывает call(), пока база занята, но не дольше timeout секунд"""
+    deadline = time.monotonic() + timeout
+    delay = FIRST_DELAY
+    while True:
+        try:
+            return call()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or time.monotonic() + delay > deadline:
+                raise
+        sleep(delay)
+        delay = min(delay * 2, MAX_DELAY)
+
+
+def connection_factory(timeout: float, sleep):
+    """
+    Класс соединения для sqlite3.connect(factory=...): execute, executemany
+    и commit при занятой базе повторяются через sleep(), всего до timeout секунд
+    """
+
+    class RetryCursor(sqlite3.Cursor):
+        def execute(self, *args):
+            return retry_busy(lambda: super(RetryCursor, self).execute(*args), timeout, sleep)
+
+        def executemany(self, *args):
+            return retry_busy(
+                lambda: super(RetryCursor, self).executemany(*args), timeout, sleep
+            )
+
+    class RetryConnection(sqlite3.Connection):
+        def cursor(self, factory=RetryCursor):
+            return super().cursor(factory)
+
+        def commit(self):
+            return retry_busy(super().commit, timeout, sleep)
+
+    return RetryConnection
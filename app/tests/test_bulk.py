@@ -0,0 +1,28 @@
+# tests/test_bulk.py
+"""Массовый импорт: на SQLite через bulk_insert_mappings, на PostgreSQL через COPY"""
+from conftest import register
+
+
+def test_bulk_import_writes_points_geohash_and_change_log(app, client):
+    register(client, 1)
+    rows = [
+        {"latitude": 55.0 + number / 10000, "longitude": 37.0, "description": f"p{number}"}
+        for number in range(app.BULK_BATCH_SIZE + 5)
+    ]
+    response = client.post("/api/location/bulk?telegram_id=1", json=rows)
+    assert response.status_code == 201, response.json
+    ids = response.get_json()["data"]["ids"]
+    assert len(set(ids)) == len(rows)
+
+    with app.app.app_context():
+        stored = app.Location.query.filter(app.Location.id.in_(ids)).all()
+        assert len(stored) == len(rows)
+        assert all(
+            location.geohash == app.spatial.encode(location.latitude, location.longitude)
+            for location in stored
+        )
+        logged = app.db.session.query(app.LocationChange.location_id).order_by(app.LocationChange.id)
+        assert [row.location_id for row in logged] == ids
+
+    nearby = client.get("/api/location/nearby?lat=55.0&lon=37.0&limit=3").get_json()
+    assert [loc["description"] for loc in nearby["data"]] == ["p0", "p1", "p2"]
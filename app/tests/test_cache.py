@@ -0,0 +1,88 @@
+# tests/test_cache.py
+"""Кэши ответов карты: одна запись на ключ, лимит по байтам, границы тайлов"""
+import pytest
+
+from cache import PayloadCache, TileCache
+from conftest import add_location, register
+
+
+def test_new_version_replaces_entry():
+    cache = PayloadCache("test", maxsize=10, maxbytes=1024)
+    cache.set("all", 1, b"old")
+    cache.set("all", 2, b"new")
+    assert cache.get("all", 1) is None
+    assert cache.get("all", 2) == b"new"
+    assert cache.stats()["size"] == 1
+    assert cache.stats()["bytes"] == 3
+
+
+def test_local_tier_is_capped_by_bytes():
+    cache = PayloadCache("test", maxsize=10, maxbytes=10)
+    cache.set("a", 1, b"12345")
+    cache.set("b", 1, b"12345")
+    cache.set("c", 1, b"12345")
+    assert cache.get("a", 1) is None
+    assert cache.stats()["bytes"] == 10
+    # Ответ больше всего кэша не кладется и не вытесняет остальные
+    cache.set("huge", 1, b"x" * 11)
+    assert cache.get("huge", 1) is None
+    assert cache.get("c", 1) == b"12345"
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+def test_shared_tier_keeps_one_copy_and_skips_large_payloads(redis_client):
+    cache = PayloadCache("test", maxsize=10, maxbytes=1024, redis_client=redis_client, shared_max_bytes=8)
+    for version in range(5):
+        cache.set("all", version, b"payload")
+    assert redis_client.keys("cache:test:*") == [b"cache:test:all"]
+
+    worker = PayloadCache("test", maxsize=10, maxbytes=1024, redis_client=redis_client)
+    assert worker.get("all", 4) == b"payload"
+    assert worker.get("all", 5) is None
+
+    cache.set("large", 5, b"123456789")
+    assert redis_client.get("cache:test:large") is None
+
+
+def test_stale_tile_written_after_invalidation_is_rejected(redis_client):
+    reader = TileCache("tiles", maxsize=10, maxbytes=1024, redis_client=redis_client)
+    worker = TileCache("tiles", maxsize=10, maxbytes=1024, redis_client=redis_client)
+    reader.set("1/0/0", 10, b"untouched")
+
+    # Запрос версии 10 прочитал точки до коммита, запись сбросила тайл
+    # и подняла версию, и только потом запрос положил свой тайл в Redis
+    worker.invalidate(["1/1/0"], 11)
+    reader.set("1/1/0", 10, b"stale")
+    assert worker.get("1/1/0", 11) is None
+    # Параллельная запись с более старой версией не опускает границу
+    worker.invalidate(["1/1/0"], 9)
+    assert worker.get("1/1/0", 11) is None
+    # Тайлы без изменений переживают смену версии
+    assert worker.get("1/0/0", 11) == b"untouched"
+
+    worker.invalidate(None, 12)
+    assert worker.get("1/0/0", 12) is None
+
+
+def test_map_cache_holds_one_copy_per_key(app, client):
+    register(client, 1)
+    for number in range(30):
+        add_location(client, 1, 10 + number * 0.01, 20)
+        assert client.get("/api/all-map-data").status_code == 200
+    assert app.map_cache.stats()["size"] == 1
+
+
+def test_nearby_viewports_share_cache_entry(app, client):
+    register(client, 1)
+    add_location(client, 1, 55.75, 37.6)
+    first = client.get("/api/map-data?bbox=37.55,55.72,37.65,55.78&zoom=15").get_json()
+    # Карту чуть сдвинули: область в пределах того же блока тайлов
+    second = client.get("/api/map-data?bbox=37.5512,55.7213,37.6513,55.7814&zoom=15").get_json()
+    assert first == second
+    assert app.map_cache.stats()["size"] == 1
+    assert [loc["latitude"] for loc in first["locations"]] == [55.75]
@@ -0,0 +1,62 @@
+# tests/test_changes.py
+"""Журнал изменений как курсор дельта-синхронизации"""
+import threading
+
+import pytest
+
+from conftest import add_location, register
+
+
+def test_changes_since_cursor(client):
+    register(client, 1)
+    version = client.get("/api/all-map-data").get_json()["version"]
+    add_location(client, 1, 10.0, 20.0, "first")
+    add_location(client, 1, 11.0, 21.0, "second")
+
+    changes = client.get(f"/api/map-data/changes?since={version}").get_json()
+    assert [loc["description"] for loc in changes["locations"]] == ["first", "second"]
+    assert changes["version"] == version + 2
+
+    again = client.get(f"/api/map-data/changes?since={changes['version']}").get_json()
+    assert again["locations"] == [] and again["version"] == changes["version"]
+
+
+def test_change_log_writers_commit_in_id_order(app):
+    """
+    В PostgreSQL второй писатель журнала ждет коммита первого, иначе клиент
+    мог бы получить версию второго и пропустить изменение первого
+    """
+    with app.app.app_context():
+        if not app.is_postgres():
+            pytest.skip("в SQLite писатель и так один")
+
+    first_logged = threading.Event()
+    first_may_commit = threading.Event()
+    ids = {}
+
+    def write(name, before_commit=None):
+        with app.app.app_context():
+            changes = app.log_location_changes("add", 1)
+            app.db.session.flush()
+            ids[name] = changes[0].id
+            if before_commit is not None:
+                before_commit()
+            app.db.session.commit()
+            app.db.session.remove()
+
+    def hold():
+        first_logged.set()
+        first_may_commit.wait(5)
+
+    first = threading.Thread(target=write, args=("first", hold))
+    first.start()
+    assert first_logged.wait(5)
+    second = threading.Thread(target=write, args=("second",))
+    second.start()
+    second.join(0.5)
+    assert second.is_alive()
+
+    first_may_commit.set()
+    first.join(5)
+    second.join(5)
+    assert ids["first"] < ids["second"]
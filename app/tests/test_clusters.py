@@ -0,0 +1,41 @@
+# tests/test_clusters.py
+"""Кластеры видимой области на средних зумах и кластеры всего мира на мелких"""
+import pytest
+
+from conftest import add_location, register
+
+
+def total(data):
+    return sum(cluster["count"] for cluster in data["clusters"]) + len(data["locations"])
+
+
+@pytest.fixture
+def points(client):
+    register(client, 1)
+    # Плотная группа в Москве (в одной ячейке сетки до 10-го зума) и точка в Берлине
+    for number in range(30):
+        add_location(client, 1, 55.75 + number * 0.0001, 37.6 + number * 0.0001)
+    add_location(client, 1, 52.52, 13.40)
+
+
+def test_viewport_clusters_count_only_visible_points(client, app, points):
+    zoom = app.WORLD_CLUSTER_MAX_ZOOM + 4
+    data = client.get(f"/api/map-data?bbox=37,55,38,56&zoom={zoom}").get_json()
+    assert data["clustered"] is True
+    assert total(data) == 30
+    assert all(cluster["count"] > 1 for cluster in data["clusters"])
+
+
+def test_viewport_clusters_keep_edge_cells_whole(client, app, points):
+    # Область обрезает группу посередине, но ячейку на краю считаем целиком
+    zoom = app.WORLD_CLUSTER_MAX_ZOOM + 4
+    data = client.get(f"/api/map-data?bbox=37.0,55.0,37.6015,55.7515&zoom={zoom}").get_json()
+    assert total(data) == 30
+
+
+def test_world_clusters_on_low_zoom(client, app, points):
+    zoom = app.WORLD_CLUSTER_MAX_ZOOM
+    data = client.get(f"/api/map-data?bbox=-180,-85,180,85&zoom={zoom}").get_json()
+    assert total(data) == 31
+    # Одиночная ячейка отдается точкой с описанием для попапа
+    assert [loc["latitude"] for loc in data["locations"]] == [52.52]
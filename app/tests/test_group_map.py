@@ -0,0 +1,27 @@
+# tests/test_group_map.py
+"""Условный GET карты группы: ETag одной группы не подходит к другой"""
+from conftest import add_location, register
+
+
+def create_group(app, client, telegram_id, title):
+    response = client.post("/api/group/create", json={"telegram_id": telegram_id, "title": title})
+    assert response.status_code == 201
+    link = response.get_json()["data"]["group_link"]
+    with app.app.app_context():
+        return app.Group.query.filter_by(group_link=link).one().id
+
+
+def test_group_map_etag_is_per_group(app, client):
+    register(client, 1, username="first", first_name="First")
+    add_location(client, 1, 55.75, 37.61, "home")
+    group_id = create_group(app, client, 1, "Друзья")
+
+    first = client.get(f"/api/group/{group_id}/map-data")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get(f"/api/group/{group_id}/map-data", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    missing = client.get("/api/group/999/map-data", headers={"If-None-Match": etag})
+    assert missing.status_code == 404
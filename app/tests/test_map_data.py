@@ -0,0 +1,50 @@
+# tests/test_map_data.py
+"""Число SQL-запросов данных карты не должно зависеть от числа точек"""
+import pytest
+
+from conftest import add_location, register
+
+
+def seed_users_with_locations(app, start, count):
+    """Пользователь на каждую точку: ленивая связь Location.user дала бы по запросу на точку"""
+    with app.app.app_context():
+        for number in range(start, start + count):
+            user = app.User(telegram_id=number, username=f"u{number}", first_name=f"F{number}")
+            app.db.session.add(user)
+            app.db.session.flush()
+            app.db.session.add(
+                app.Location(
+                    latitude=number % 90,
+                    longitude=number % 180,
+                    description=f"d{number}",
+                    user_id=user.id,
+                )
+            )
+        app.db.session.commit()
+    # Запись мимо маршрутов API: сбрасываем кэш карты вручную
+    app.data_version.bump()
+
+
+@pytest.mark.parametrize("url", ["/api/all-map-data", "/api/all-map-data?stream=1"])
+def test_all_map_data_query_count_is_constant(app, client, count_queries, url):
+    register(client, 1, username="first", first_name="First")
+    add_location(client, 1, 10.0, 20.0)
+    client.get(url)  # первый запрос создает таблицы и греет соединение
+
+    app.data_version.bump()
+    with count_queries() as one_row:
+        response = client.get(url)
+    assert response.status_code == 200
+    locations = response.get_json()["locations"]
+    assert [(loc["first_name"], loc["username"]) for loc in locations] == [("First", "first")]
+
+    seed_users_with_locations(app, 1000, 200)
+    with count_queries() as many_rows:
+        response = client.get(url)
+    assert response.status_code == 200
+    locations = response.get_json()["locations"]
+    assert len(locations) == 201
+    assert {loc["first_name"] for loc in locations} >= {"First", "F1000", "F1199"}
+
+    assert len(one_row) == len(many_rows)
+    assert len(many_rows) <= 2
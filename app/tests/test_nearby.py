@@ -0,0 +1,67 @@
+# tests/test_nearby.py
+"""Поиск ближайших по геохэшу совпадает с полным перебором"""
+import random
+
+import pytest
+
+from conftest import register
+
+
+@pytest.fixture
+def points(app, client):
+    register(client, 1)
+    rnd = random.Random(4)
+    coordinates = [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(1500)]
+    # Сгущения у линии перемены дат и у полюса
+    coordinates += [(rnd.uniform(-5, 5), rnd.choice((-1, 1)) * rnd.uniform(179, 180)) for _ in range(200)]
+    coordinates += [(rnd.uniform(88, 90), rnd.uniform(-180, 180)) for _ in range(200)]
+    with app.app.app_context():
+        app.db.session.add_all(
+            app.Location(latitude=lat, longitude=lon, description="p", user_id=1)
+            for lat, lon in coordinates
+        )
+        app.db.session.commit()
+    return coordinates
+
+
+def brute_force(app, coordinates, latitude, longitude):
+    return sorted(
+        app.spatial.distance_m(latitude, longitude, lat, lon) for lat, lon in coordinates
+    )
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude",
+    [(55.75, 37.6), (0.0, 179.9), (0.5, -179.95), (89.5, 10.0), (-45.0, -120.0)],
+)
+def test_nearest_matches_brute_force(app, client, points, latitude, longitude):
+    response = client.get(f"/api/location/nearby?lat={latitude}&lon={longitude}&limit=20")
+    distances = [loc["distance"] for loc in response.get_json()["data"]]
+    expected = brute_force(app, points, latitude, longitude)[:20]
+    assert distances == pytest.approx(expected, abs=0.1)
+
+
+@pytest.mark.parametrize("latitude, longitude", [(0.0, 179.9), (89.5, 10.0)])
+@pytest.mark.parametrize("radius", [50_000, 300_000])
+def test_radius_matches_brute_force(app, client, points, latitude, longitude, radius):
+    response = client.get(
+        f"/api/location/nearby?lat={latitude}&lon={longitude}&radius={radius}&limit=100"
+    )
+    distances = [loc["distance"] for loc in response.get_json()["data"]]
+    expected = [d for d in brute_force(app, points, latitude, longitude) if d <= radius][:100]
+    assert distances == pytest.approx(expected, abs=0.1)
+
+
+def test_prefix_end_bounds_exactly_the_prefix(app):
+    assert app.spatial.prefix_end("u4pr") == "u4ps"
+    assert app.spatial.prefix_end("u4pz") == "u4q"
+    assert app.spatial.prefix_end("9") == "b"
+    assert app.spatial.prefix_end("zz") is None
+
+    rnd = random.Random(2)
+    hashes = [app.spatial.encode(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(2000)]
+    for prefix in {geohash[:3] for geohash in hashes[:50]} | {"z", "9z"}:
+        end = app.spatial.prefix_end(prefix)
+        for geohash in hashes:
+            in_range = geohash >= prefix and (end is None or geohash < end)
+            assert in_range == geohash.startswith(prefix)
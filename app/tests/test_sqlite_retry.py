@@ -0,0 +1,58 @@
+# tests/test_sqlite_retry.py
+"""Ожидание занятой SQLite под gevent не останавливает остальные гринлеты"""
+import sqlite3
+
+import pytest
+
+import sqlite_retry
+
+gevent = pytest.importorskip("gevent")
+
+
+def connect(path, **kwargs):
+    connection = sqlite3.connect(path, isolation_level=None, **kwargs)
+    connection.execute("PRAGMA busy_timeout = 5")
+    return connection
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "busy.db")
+    connection = connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("CREATE TABLE point (id INTEGER PRIMARY KEY)")
+    connection.close()
+    return path
+
+
+def test_writer_waits_cooperatively_for_lock(db_path):
+    holder = connect(db_path)
+    holder.execute("BEGIN IMMEDIATE")
+    writer = connect(
+        db_path, factory=sqlite_retry.connection_factory(5, gevent.sleep), check_same_thread=False
+    )
+    ticks = []
+
+    def other_requests():
+        # Пока писатель ждет, воркер продолжает обслуживать остальных
+        for _ in range(20):
+            ticks.append(1)
+            gevent.sleep(0.01)
+        holder.execute("COMMIT")
+
+    other = gevent.spawn(other_requests)
+    write = gevent.spawn(lambda: writer.cursor().execute("INSERT INTO point DEFAULT VALUES"))
+    gevent.joinall([other, write], timeout=5, raise_error=True)
+
+    assert len(ticks) == 20
+    assert write.successful()
+    assert writer.execute("SELECT count(*) FROM point").fetchone() == (1,)
+
+
+def test_gives_up_after_timeout(db_path):
+    holder = connect(db_path)
+    holder.execute("BEGIN IMMEDIATE")
+    writer = connect(db_path, factory=sqlite_retry.connection_factory(0.05, gevent.sleep))
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        writer.cursor().execute("INSERT INTO point DEFAULT VALUES")
+    holder.execute("ROLLBACK")
@@ -0,0 +1,85 @@
+# tests/test_users.py
+"""Регистрация пользователей"""
+import threading
+from collections import Counter
+
+from conftest import register
+
+
+def test_parallel_registrations_create_one_user(app):
+    statuses = Counter()
+    barrier = threading.Barrier(8)
+
+    def register():
+        client = app.app.test_client()
+        barrier.wait()
+        for _ in range(10):
+            response = client.post(
+                "/api/user/add",
+                json={"telegram_id": 42, "username": "same", "first_name": "Same"},
+            )
+            statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=register) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses[500] == 0
+    # "Пользователь успешно добавлен" (200) ровно один раз, остальные — "уже существует" (201)
+    assert statuses == Counter({200: 1, 201: 79})
+    with app.app.app_context():
+        assert app.User.query.filter_by(telegram_id=42).count() == 1
+
+
+def test_rolled_back_batch_does_not_cache_user_id(app, client):
+    response = client.post(
+        "/api/batch",
+        json={
+            "operations": [
+                {"op": "user.add", "params": {"telegram_id": 100}},
+                {
+                    "op": "user.update_training_stage",
+                    "params": {"telegram_id": 100, "new_training_stage": 1},
+                },
+                # Без описания — ошибка проверки, пакет откатывается целиком
+                {"op": "location.add", "params": {"telegram_id": 100, "latitude": 1, "longitude": 1}},
+            ]
+        },
+    )
+    assert response.status_code == 400
+    assert app.user_ids.get(100) is None
+
+    # id откатанной строки достается следующему пользователю
+    register(client, 200)
+    response = client.post(
+        "/api/location/add",
+        json={"telegram_id": 100, "latitude": 1, "longitude": 1, "description": "x"},
+    )
+    assert response.status_code == 404
+    response = client.get("/api/user/200/locations")
+    assert response.get_json()["data"] == []
+
+
+def test_add_user_rejects_non_integer_telegram_id(app, client):
+    response = client.post("/api/user/add", json={"telegram_id": "abc"})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    with app.app.app_context():
+        assert app.User.query.count() == 0
+
+
+def test_cached_user_id_saves_a_query_per_request(app, client, count_queries):
+    register(client, 1)
+    app.user_ids.clear()
+    url = "/api/user/1/groups"
+
+    with count_queries() as cold:
+        assert client.get(url).status_code == 200
+    with count_queries() as warm:
+        assert client.get(url).status_code == 200
+
+    assert len(warm) == len(cold) - 1
+    assert not any('FROM "user"' in statement or "FROM user" in statement for statement in warm)
+    assert app.user_ids.get(1) is not None
@@ -0,0 +1,181 @@
+# async_handlers/group_handlers.py
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import CallbackQuery, Message
+import logging
+from config import BOT_NAME, GROUPS_PAGE_SIZE
+from utils.async_api import (
+    api_get,
+    api_post,
+    api_delete,
+    handle_api_error,
+    page_endpoint,
+)
+from utils.states import AddGroupState
+from utils.sender import async_sender
+from keyboards.inline import (
+    admin_groups_keyboard,
+    user_groups_page,
+    delete_group_button,
+    MAIN_MENU,
+    add_comm_main_menu,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def register_handlers(bot: AsyncTeleBot):
+
+    async def show_user_groups_page(call: CallbackQuery, cursor: str = None):
+        result, e = await api_get(
+            page_endpoint(f"user/{call.from_user.id}/groups", GROUPS_PAGE_SIZE, cursor)
+        )
+        if e:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+
+        groups = result["data"]
+        if not groups and cursor:
+            return await show_user_groups_page(call)
+        if not groups:
+            await bot.edit_message_text(
+                add_comm_main_menu(
+                    """Вы не участвуете ни в одной группе.
+                    Попросите ссылку на вступление у Администратора группы."""
+                ),
+                call.message.chat.id,
+                call.message.message_id,
+            )
+            return
+
+        text, markup = user_groups_page(groups, result["paging"])
+        await async_sender.edit_message_text(
+            bot, text, call.message.chat.id, call.message.message_id, reply_markup=markup
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "my_groups")
+    async def show_user_groups(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await show_user_groups_page(call)
+
+    @bot.callback_query_handler(
+        func=lambda call: call.data.startswith(("my_groups_after_", "my_groups_before_"))
+    )
+    async def show_user_groups_more(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await show_user_groups_page(call, call.data.split("_", 2)[2])
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith("leave_group_"))
+    async def leave_group(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        group_id = call.data.split("_")[-1]
+
+        result, e = await api_delete(
+            f"group/{group_id}/leave", {"telegram_id": call.from_user.id}
+        )
+
+        if e and e.status_code is None:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+
+        msg = result["message"] if result else e.message
+        await bot.edit_message_text(
+            add_comm_main_menu(msg), call.message.chat.id, call.message.message_id
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "admin_groups")
+    async def admin_menu(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        markup = admin_groups_keyboard()
+        await bot.edit_message_text(
+            "Выберите действие:",
+            call.message.chat.id,
+            call.message.message_id,
+            reply_markup=markup,
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "list_managed_groups")
+    async def list_managed_groups(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+
+        result, e = await api_get(f"user/{call.from_user.id}/admin-groups")
+        if e:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+
+        groups = result["data"]
+        if not groups:
+            await bot.edit_message_text(
+                add_comm_main_menu("У вас нет групп, которыми вы управляете."),
+                call.message.chat.id,
+                call.message.message_id,
+            )
+            return
+
+        await bot.edit_message_text(
+            "Вы управляете этими группами:",
+            call.message.chat.id,
+            call.message.message_id,
+        )
+        for group in groups:
+            link = f"https://t.me/{BOT_NAME}?start=join_{group['group_link']}"
+            text = (
+                f"📍 <b>{group['title']}</b>\n🔗 Ссылка для приглашения: {link}"
+                f"\n👥 Участников: {group['members_count']}"
+            )
+            await async_sender.send_message(
+                bot,
+                call.message.chat.id,
+                text,
+                reply_markup=delete_group_button(group["id"]),
+            )
+        await bot.send_message(call.message.chat.id, MAIN_MENU)
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith("delete_group_"))
+    async def delete_group(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        group_id = call.data.split("_")[-1]
+
+        result, e = await api_delete(
+            f"group/{group_id}/delete", {"telegram_id": call.from_user.id}
+        )
+
+        if e and e.status_code is None:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+
+        msg = "Группа удалена." if result else e.message
+        await bot.edit_message_text(
+            add_comm_main_menu(msg), call.message.chat.id, call.message.message_id
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "add_manage_group")
+    async def add_group_title(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await bot.edit_message_text(
+            "Введите название новой группы:",
+            call.message.chat.id,
+            call.message.message_id,
+        )
+        await bot.set_state(call.from_user.id, AddGroupState.title, call.message.chat.id)
+
+    @bot.message_handler(state=AddGroupState.title)
+    async def receive_group_title(message: Message):
+        payload = {"telegram_id": message.from_user.id, "title": message.text}
+
+        result, e = await api_post("group/create", payload)
+        await bot.delete_state(message.from_user.id, message.chat.id)
+
+        if e and e.status_code is None:
+            await handle_api_error(bot, message.chat.id)
+            return
+
+        if e:
+            await bot.send_message(message.chat.id, add_comm_main_menu(e.message))
+            return
+
+        link = f"https://t.me/{BOT_NAME}?start=join_{result['data']['group_link']}"
+        await bot.send_message(
+            message.chat.id, f"Группа создана ✅\n🔗 Ссылка для приглашения: {link}"
+        )
+        await bot.send_message(message.chat.id, MAIN_MENU)
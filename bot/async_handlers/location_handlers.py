@@ -0,0 +1,254 @@
+# async_handlers/location_handlers.py
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import CallbackQuery, Message
+import logging
+from config import FINAL_STAGE_TRAINING, LOCATIONS_PAGE_SIZE
+from utils.async_api import (
+    api_get,
+    api_delete,
+    handle_api_error,
+    page_endpoint,
+    APIBatch,
+    main_menu_keyboard,
+)
+from utils.states import AddLocationState, AsyncUserStorage
+from utils.sender import async_sender
+from keyboards.inline import (
+    location_action_keyboard,
+    add_another_location,
+    locations_page,
+)
+from utils.texts import main_message
+
+
+logger = logging.getLogger(__name__)
+
+ALL_CONTENT_TYPES = [
+    "text",
+    "audio",
+    "document",
+    "photo",
+    "sticker",
+    "video",
+    "voice",
+    "video_note",
+    "contact",
+    "location",
+    "venue",
+    "animation",
+]
+
+
+def register_handlers(bot: AsyncTeleBot):
+
+    @bot.callback_query_handler(func=lambda call: call.data == "locations")
+    async def locations_menu(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await bot.send_message(
+            call.message.chat.id,
+            "Что вы хотите сделать с локациями?",
+            reply_markup=location_action_keyboard(),
+        )
+
+    async def show_locations_page(call: CallbackQuery, cursor: str, edit: bool):
+        result, e = await api_get(
+            page_endpoint(
+                f"user/{call.from_user.id}/locations", LOCATIONS_PAGE_SIZE, cursor
+            )
+        )
+
+        if e:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+        locations = result["data"]
+        if not locations and cursor:
+            # Страницу успели удалить целиком — показываем начало списка
+            return await show_locations_page(call, None, edit)
+        if not locations:
+            await async_sender.send_message(
+                bot,
+                call.message.chat.id,
+                "У вас нет сохранённых локаций.",
+                reply_markup=add_another_location(call.from_user),
+            )
+            return
+
+        # Одна страница из API одним сообщением, следующая — по кнопке
+        text, markup = locations_page(locations, result["paging"], "Ваши локации:")
+        if edit:
+            await async_sender.edit_message_text(
+                bot,
+                text,
+                call.message.chat.id,
+                call.message.message_id,
+                reply_markup=markup,
+            )
+        else:
+            await async_sender.send_message(
+                bot, call.message.chat.id, text, reply_markup=markup
+            )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "list_locations")
+    async def list_user_locations(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await show_locations_page(call, None, edit=False)
+
+    @bot.callback_query_handler(
+        func=lambda call: call.data.startswith(("locations_after_", "locations_before_"))
+    )
+    async def list_user_locations_page(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await show_locations_page(call, call.data.split("_", 1)[1], edit=True)
+
+    @bot.callback_query_handler(
+        func=lambda call: call.data.startswith("delete_location_")
+    )
+    async def delete_location(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        location_id = call.data.split("_")[-1]
+        payload = {"telegram_id": call.from_user.id}
+        result, e = await api_delete(f"location/{location_id}/delete", payload)
+
+        if e:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+
+        if result:
+            await bot.send_message(
+                call.message.chat.id,
+                result["message"],
+                reply_markup=add_another_location(call.from_user),
+            )
+        else:
+            await bot.send_message(
+                call.message.chat.id,
+                "Ошибка при удалении локации.",
+                location_action_keyboard(),
+            )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "add_location")
+    async def start_add_location(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+        await bot.send_message(
+            call.message.chat.id,
+            ("Введи описание для новой локации\n" "или отмените добавление /cancel"),
+        )
+        await bot.set_state(
+            call.from_user.id, AddLocationState.description, call.message.chat.id
+        )
+
+    @bot.message_handler(state=AddLocationState.description)
+    async def receive_description(message: Message):
+        # пример как кнопку геолокации передать
+        # markup = ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
+        # location_button = KeyboardButton(
+        #     "📍Поделиться локацией",
+        #     request_location=True
+        # )
+        # markup.add(location_button)
+        # bot.send_message(message.chat.id, "Теперь отправьте геопозицию 📍", reply_markup=markup)
+
+        await bot.send_message(
+            message.chat.id,
+            (
+                "📍 Теперь, отправьте геопозицию через 📎 (кнопка 'Прикрепить' -> 'Геопозиция')\n"
+                "⚠️Можно приблезительную, помни о безопасности!⚠️\n"
+                "или отмените добавление /cancel"
+            ),
+        )
+        await bot.set_state(message.from_user.id, AddLocationState.location, message.chat.id)
+        async with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            data["description"] = message.text
+
+    @bot.message_handler(
+        state=AddLocationState.location, content_types=ALL_CONTENT_TYPES
+    )
+    async def handle_location_state(message: Message):
+
+        if message.content_type == "location":
+            latitude = message.location.latitude
+            longitude = message.location.longitude
+            venue_parts = []
+        elif message.content_type == "venue":
+            latitude = message.venue.location.latitude
+            longitude = message.venue.location.longitude
+            venue_parts = []
+            if message.venue.title:
+                venue_parts.append(message.venue.title)
+            if message.venue.address:
+                venue_parts.append(message.venue.address)
+        else:
+            warning_msg = (
+                "❌ Ты находишся в режиме добавления локации.\n"
+                "Пожалуйста, отправь геопозицию через 📎 (кнопка 'Прикрепить' -> 'Геопозиция' или 'Место')\n"
+                "Или отправь /cancel для отмены"
+            )
+            await bot.send_message(message.chat.id, warning_msg)
+
+            logger.warning(
+                f"User {message.from_user.id} sent wrong content type in location state: "
+                f"{message.content_type}"
+            )
+            return  # Выходим из функции, чтобы не выполнять остальной код
+
+        # Обработка location или venue
+        async with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            base_description = data.get("description", "")
+
+            if venue_parts:
+                venue_info = ", ".join(venue_parts)
+                description = (
+                    f"{base_description} ({venue_info})"
+                    if base_description
+                    else f"({venue_info})"
+                )
+            else:
+                description = base_description
+
+            payload = {
+                "telegram_id": message.from_user.id,
+                "description": description,
+                "latitude": latitude,
+                "longitude": longitude,
+            }
+
+            # Локация и этап обучения одним запросом и одной транзакцией
+            batch = APIBatch()
+            batch.add("location.add", **payload)
+            stage_index = batch.add(
+                "user.update_training_stage",
+                telegram_id=message.from_user.id,
+                new_training_stage=3,
+                at_least=True,
+            )
+            results, e = await batch.send()
+
+            if e:
+                await handle_api_error(bot, message.chat.id)
+                return
+
+            training_stage = results[stage_index]["training_stage"]
+            # Меню ниже возьмет этап из кэша, без еще одного запроса
+            await AsyncUserStorage(bot, message.from_user.id, message.chat.id).set_training_stage(
+                training_stage
+            )
+
+            if training_stage < FINAL_STAGE_TRAINING:
+                await bot.send_message(
+                    message.chat.id,
+                    text=main_message(training_stage).format(
+                        first_name=message.from_user.first_name
+                    ),
+                    reply_markup=await main_menu_keyboard(
+                        bot, message.from_user, message.chat.id
+                    ),
+                )
+                return
+            await bot.send_message(
+                message.chat.id,
+                ("Локация успешно добавлена ✅\n мошешь добавить еще точки 🤗"),
+                reply_markup=add_another_location(message.from_user),
+            )
+
+        await bot.delete_state(message.from_user.id, message.chat.id)
@@ -0,0 +1,134 @@
+# async_handlers/start_handlers.py
+
+from telebot.types import Message
+from telebot.async_telebot import AsyncTeleBot
+import logging
+from utils.texts import (
+    ABOUT_MESSAGE,
+    HELP_MESSAGE,
+    main_message
+)
+from utils.async_api import (
+    api_get,
+    api_post,
+    handle_api_error,
+    get_training_stage,
+    main_menu_keyboard,
+)
+from keyboards.inline import (
+    add_comm_main_menu,
+    admin_menu_keyboard,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def register_handlers(bot: AsyncTeleBot):
+
+    @bot.message_handler(commands=["start", "main"])
+    async def handle_start(message: Message):
+        user_tg = message.from_user
+        # Если training_stage есть в кэше, то мы уже получали пользователя,
+        # т.е. он есть уже в базе, и запроса к API не будет
+
+        training_stage = await get_training_stage(bot, user_tg, message.chat.id)
+        args = message.text.split()
+        # Deep link: /start join_abc123
+        if len(args) > 1 and args[1].startswith("join_"):
+            invite_code = args[1].split("join_", 1)[1]
+            logger.info(
+                f"@{user_tg.username} использует ссылку приглашения: {invite_code}"
+            )
+
+            # Проверка валидности ссылки
+            response = await api_get(f"check-invite-code/{invite_code}")
+            if response is None:
+                await handle_api_error(bot, message.chat.id)
+                return
+
+            if not response.get("valid"):
+                await bot.reply_to(
+                    message,
+                    add_comm_main_menu("Эта ссылка недействительна или устарела."),
+                )
+                return
+
+            # Присоединяем пользователя к группе
+            join_resp = await api_post(
+                f"join-group/{invite_code}", {"telegram_id": user_tg.id}
+            )
+            if join_resp is None:
+                await handle_api_error(bot, message.chat.id)
+                return
+
+            join_msg = join_resp.get("message", "Не удалось присоединиться к группе.")
+            await bot.reply_to(message, add_comm_main_menu(join_msg))
+
+        # Основное сообщение
+        first_name = user_tg.first_name or "Дорогой друг"
+        await bot.send_message(
+            message.chat.id,
+            text=main_message(training_stage).format(first_name=first_name),
+            reply_markup=await main_menu_keyboard(bot, user_tg, message.chat.id),
+        )
+
+    @bot.message_handler(commands=["about"])
+    async def handle_about(message: Message):
+
+        await bot.send_message(
+            message.chat.id,
+            text=ABOUT_MESSAGE,
+            reply_markup=await main_menu_keyboard(
+                bot, message.from_user, message.chat.id
+            ),
+        )
+
+    @bot.message_handler(commands=["help"])
+    async def handle_help(message: Message):
+        text = HELP_MESSAGE
+
+        await bot.send_message(
+            message.chat.id,
+            text=text,
+            reply_markup=await main_menu_keyboard(
+                bot, message.from_user, message.chat.id
+            ),
+        )
+
+    @bot.message_handler(commands=["cancel"])
+    async def cancel_fsm(message: Message):
+        state = await bot.get_state(message.from_user.id, message.chat.id)
+        if state is None:
+            await bot.send_message(
+                message.chat.id, add_comm_main_menu("Нет активного действия.")
+            )
+            return
+
+        await bot.delete_state(message.from_user.id, message.chat.id)
+        await bot.send_message(
+            message.chat.id, add_comm_main_menu("❌ Действие отменено.")
+        )
+
+    @bot.message_handler(commands=["admin03"])
+    async def admin03(message: Message):
+        await bot.send_message(
+            message.chat.id,
+            text="Вы попали в скрытое меню",
+            reply_markup=admin_menu_keyboard(),
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "main_menu")
+    async def handle_main_menu_callback(call):
+        # Основное сообщение
+        await bot.answer_callback_query(callback_query_id=call.id)
+        first_name = call.from_user.first_name or "Дорогой друг"
+        training_stage = await get_training_stage(
+            bot, call.from_user, call.message.chat.id
+        )
+        await bot.send_message(
+            call.message.chat.id,
+            text=main_message(training_stage).format(first_name=first_name),
+            reply_markup=await main_menu_keyboard(
+                bot, call.from_user, call.message.chat.id
+            ),
+        )
@@ -0,0 +1,150 @@
+# async_handlers/training_handlers.py
+
+from telebot.types import Message, ReplyKeyboardRemove, CallbackQuery
+from telebot.async_telebot import AsyncTeleBot
+import logging
+from config import FINAL_STAGE_TRAINING, LOCATIONS_PAGE_SIZE
+from utils.texts import (
+    main_message,
+    MAIN_MESSAGE_S4_FiNAL_TRANING,
+)
+from utils.async_api import (
+    api_get,
+    handle_api_error,
+    update_training_stage,
+    page_endpoint,
+    main_menu_keyboard,
+)
+from keyboards.inline import locations_page
+from utils.sender import async_sender
+
+
+logger = logging.getLogger(__name__)
+
+
+def register_handlers(bot: AsyncTeleBot):
+
+    @bot.message_handler(commands=["skip_training"])
+    async def skip_training(message: Message):
+        training_stage = FINAL_STAGE_TRAINING
+        training_stage, error = await update_training_stage(
+            bot, message.from_user.id, training_stage, message.chat.id
+        )
+        if error:
+            return
+        await bot.send_message(
+            message.chat.id,
+            text="Отлично, как тольо у нас появится что-то новое, я дам тебе знать.\nТы всегда можешь пройти обучение заного /repeat_training",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+        await bot.send_message(
+            message.chat.id,
+            text=main_message(training_stage).format(
+                first_name=message.from_user.first_name
+            ),
+            reply_markup=await main_menu_keyboard(
+                bot, message.from_user, message.chat.id
+            ),
+        )
+
+    @bot.message_handler(commands=["repeat_training"])
+    async def repeat_training(message: Message):
+        training_stage = 0
+        training_stage, error = await update_training_stage(
+            bot, message.from_user.id, training_stage, message.chat.id
+        )
+        if error:
+            return
+        await bot.send_message(
+            message.chat.id,
+            text="Отлично, наченем сначала.\nТы всегда можешь пропусть /skip_training",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+        await bot.send_message(
+            message.chat.id,
+            text=main_message(training_stage).format(
+                first_name=message.from_user.first_name
+            ),
+            reply_markup=await main_menu_keyboard(
+                bot, message.from_user, message.chat.id
+            ),
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "training_start_map")
+    async def training_start_map(call):
+        await bot.answer_callback_query(callback_query_id=call.id)
+        first_name = call.from_user.first_name or "Дорогой друг"
+        training_stage = 1
+        training_stage, error = await update_training_stage(
+            bot, call.from_user.id, training_stage, call.message.chat.id
+        )
+        if error:
+            await handle_api_error(bot, call.message.chat.id)
+            return
+
+        await bot.send_message(
+            call.message.chat.id,
+            text=main_message(training_stage).format(first_name=first_name),
+            reply_markup=await main_menu_keyboard(
+                bot, call.from_user, call.message.chat.id
+            ),
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "training_add_location")
+    async def training_add_location(call):
+        await bot.answer_callback_query(callback_query_id=call.id)
+        first_name = call.from_user.first_name or "Дорогой друг"
+        training_stage = 2
+        training_stage, error = await update_training_stage(
+            bot, call.from_user.id, training_stage, call.message.chat.id
+        )
+        if error:
+            await handle_api_error(bot, call.message.chat.id)
+            return
+        await bot.send_message(
+            call.message.chat.id,
+            text=main_message(training_stage).format(first_name=first_name),
+            reply_markup=await main_menu_keyboard(
+                bot, call.from_user, call.message.chat.id
+            ),
+        )
+
+    @bot.callback_query_handler(
+        func=lambda call: call.data == "training_list_locations"
+    )
+    async def training_list_locations(call: CallbackQuery):
+        await bot.answer_callback_query(call.id)
+
+        result, e = await api_get(
+            page_endpoint(f"user/{call.from_user.id}/locations", LOCATIONS_PAGE_SIZE)
+        )
+
+        if e:
+            await handle_api_error(bot, call.message.chat.id, call.message.message_id)
+            return
+        locations = result["data"]
+        if not locations:
+
+            await bot.send_message(
+                call.message.chat.id,
+                "У вас нет сохранённых локаций. Давай добавим точку",
+            )
+            await training_add_location(call)
+            return
+
+        text, markup = locations_page(locations, result["paging"], "Твои локации:")
+        await async_sender.send_message(bot, call.message.chat.id, text, reply_markup=markup)
+        training_stage = FINAL_STAGE_TRAINING
+        training_stage, error = await update_training_stage(
+            bot, call.from_user.id, training_stage, call.message.chat.id
+        )
+        if error:
+            await handle_api_error(bot, call.message.chat.id)
+            return
+        await bot.send_message(
+            call.message.chat.id,
+            text=MAIN_MESSAGE_S4_FiNAL_TRANING,
+            reply_markup=await main_menu_keyboard(
+                bot, call.from_user, call.message.chat.id
+            ),
+        )
@@ -0,0 +1,96 @@
+# benchmarks/api_client.py
+"""
+Клиент API с пулом keep-alive соединений против requests.get на каждый вызов.
+
+Поднимает API под gunicorn с gevent-воркерами на временной базе и делает
+одни и те же последовательные GET /api/user/<id>/locations сначала новым
+соединением на каждый запрос, затем через utils.api.api_get.
+
+    python bot/benchmarks/api_client.py [--requests 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(os.path.dirname(BOT_DIR), "app")
+
+
+def summary(name, values):
+    q = statistics.quantiles(sorted(values), n=100)
+    return f"{name}: n={len(values)} p50={q[49]:.1f}ms p99={q[98]:.1f}ms"
+
+
+def measure(call, count):
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=18091)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--locations", type=int, default=20, help="точек у пользователя")
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}/api"
+    db_path = os.path.join(tempfile.mkdtemp(prefix="botpc-bench-"), "data.db")
+    env = dict(os.environ, DATABASE_URI="sqlite:///" + db_path)
+    env.pop("REDIS_HOST", None)
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "--workers", str(args.workers),
+            "--worker-class", "gevent",
+            "--keep-alive", "60",
+            "--bind", f"127.0.0.1:{args.port}",
+            "app:app",
+        ],
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f"{base}/cache/stats", timeout=5)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        requests.post(f"{base}/user/add", json={"telegram_id": 1, "first_name": "Bench"})
+        for number in range(args.locations):
+            requests.post(
+                f"{base}/location/add",
+                json={"telegram_id": 1, "latitude": 55 + number / 100, "longitude": 37, "description": "p"},
+            )
+
+        # Клиент читает API_URL из окружения при импорте
+        os.environ["API_URL"] = base
+        sys.path.insert(0, BOT_DIR)
+        from utils.api import api_get, get_api_stats
+
+        plain = measure(lambda: requests.get(f"{base}/user/1/locations", timeout=10).json(), args.requests)
+        pooled = measure(lambda: api_get("user/1/locations"), args.requests)
+        print(summary("requests.get per call", plain))
+        print(summary("pooled api_get      ", pooled))
+        print("pools:", json.dumps(get_api_stats()["pools"]))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# benchmarks/load_test.py
+"""
+Пропускная способность бота: TeleBot с пулом потоков против AsyncTeleBot.
+
+Для каждого режима поднимает фейковые Telegram Bot API и API бэкенда с
+фиксированной задержкой ответа (aiohttp), отдает боту --updates апдейтов
+/start от разных пользователей и меряет, за сколько он на все ответит.
+
+    python bot/benchmarks/load_test.py [--updates 300] [--modes sync sync16 async]
+
+Режимы: sync — TeleBot как в main.py (пул telebot по умолчанию),
+syncN — TeleBot с пулом из N потоков, async — main_async.main().
+Redis не нужен: бот откатывается на хранилище состояний в памяти.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from urllib.parse import parse_qs
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(updates, tg_delay, api_delay, port):
+    """Фейковые Telegram Bot API и API бэкенда"""
+    from aiohttp import web
+
+    state = {"first": None, "last": None, "sent": 0, "api": 0, "errors": 0}
+
+    def update(number):
+        user = {"id": 1000 + number, "is_bot": False, "first_name": f"U{number}", "username": f"u{number}"}
+        return {
+            "update_id": number,
+            "message": {
+                "message_id": number,
+                "date": int(time.time()),
+                "chat": {"id": 1000 + number, "type": "private"},
+                "from": user,
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }
+
+    async def telegram(request):
+        method = request.match_info["method"]
+        data = dict(request.query)
+        body = await request.text()
+        if request.content_type == "application/json" and body:
+            data.update(json.loads(body))
+        elif request.content_type == "application/x-www-form-urlencoded":
+            data.update({key: value[0] for key, value in parse_qs(body).items()})
+        if method == "getUpdates":
+            offset = max(int(data.get("offset") or 1), 1)
+            batch = [update(number) for number in range(offset, min(offset + 100, updates + 1))]
+            if not batch:
+                await asyncio.sleep(0.5)
+            elif state["first"] is None:
+                state["first"] = time.perf_counter()
+            return web.json_response({"ok": True, "result": batch})
+        if method == "getMe":
+            return web.json_response(
+                {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "B", "username": "b"}}
+            )
+        await asyncio.sleep(tg_delay)
+        if method == "sendMessage":
+            state["sent"] += 1
+            state["last"] = time.perf_counter()
+            state["errors"] += "Ошибка" in str(data.get("text", ""))
+        chat = {"id": int(data.get("chat_id", 1)), "type": "private"}
+        return web.json_response({"ok": True, "result": {"message_id": 1, "date": 0, "chat": chat, "text": "x"}})
+
+    async def api(request):
+        state["api"] += 1
+        await asyncio.sleep(api_delay)
+        return web.json_response({"status": "success", "message": "ok", "data": {"training_stage": 1}})
+
+    async def stats(request):
+        elapsed = state["last"] - state["first"] if state["last"] and state["first"] else None
+        return web.json_response(dict(state, elapsed=elapsed))
+
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", telegram)
+    app.router.add_route("*", "/api/{tail:.*}", api)
+    app.router.add_get("/stats", stats)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as response:
+        return json.load(response)
+
+
+def run_bot(mode, updates, port):
+    """Запускает бота в режиме mode и ждет ответа на все апдейты"""
+    import logging
+
+    os.environ.update(
+        BOT_TOKEN="1:bench",
+        API_URL=f"http://127.0.0.1:{port}/api",
+        REDIS_HOST="127.0.0.1",
+        REDIS_PORT="1",
+    )
+    sys.path.insert(0, BOT_DIR)
+    os.chdir(BOT_DIR)
+    api_url = f"http://127.0.0.1:{port}/bot{{0}}/{{1}}"
+    if mode.startswith("sync"):
+        import main
+
+        main.telebot.apihelper.API_URL = api_url
+        if mode != "sync":
+            main.bot.worker_pool = main.telebot.util.ThreadPool(main.bot, num_threads=int(mode[4:]))
+
+        def target():
+            main.bot.infinity_polling(timeout=1, long_polling_timeout=1)
+
+    else:
+        import telebot.asyncio_helper
+
+        telebot.asyncio_helper.API_URL = api_url
+        import main_async
+
+        def target():
+            asyncio.run(main_async.main())
+
+    logging.getLogger().setLevel(logging.WARNING)
+    threading.Thread(target=target, daemon=True).start()
+
+    while True:
+        result = stats(port)
+        if result["sent"] >= updates:
+            break
+        time.sleep(0.05)
+    print(
+        f"{mode:7} n={updates}: {updates / result['elapsed']:.1f} updates/s ({result['elapsed']:.2f}s), "
+        f"api calls {result['api']}, error replies {result['errors']}",
+        flush=True,
+    )
+    # Потоки polling не завершаются сами
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--modes", nargs="+", default=["sync", "sync16", "async"])
+    parser.add_argument("--tg-delay", type=float, default=0.1, help="ответ Telegram, с")
+    parser.add_argument("--api-delay", type=float, default=0.02, help="ответ бэкенда, с")
+    parser.add_argument("--port", type=int, default=18092)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.updates, args.tg_delay, args.api_delay, args.port)
+    if args.run:
+        return run_bot(args.run, args.updates, args.port)
+
+    common = [
+        "--updates", str(args.updates),
+        "--tg-delay", str(args.tg_delay),
+        "--api-delay", str(args.api_delay),
+        "--port", str(args.port),
+    ]
+    for mode in args.modes:
+        # Свежий фейковый сервер на каждый режим: апдейты и счетчики с нуля
+        server = subprocess.Popen([sys.executable, __file__, "--serve"] + common)
+        try:
+            for _ in range(100):
+                try:
+                    stats(args.port)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            subprocess.run(
+                [sys.executable, __file__, "--run", mode] + common,
+                stderr=subprocess.DEVNULL,
+                timeout=600,
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
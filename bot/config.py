@@ -11,4 +11,28 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 BOT_NAME = os.getenv("BOT_NAME")
 HELP_USERNAMES = os.getenv("HELP_USERNAMES")
 TIMEOUT = int(os.getenv("TIMEOUT", 10))
+# TIMEOUT — таймаут чтения ответа API, на установку соединения даем меньше
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", min(TIMEOUT, 3)))
+# Сколько keep-alive соединений к API держим одновременно
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 10))
 FINAL_STAGE_TRAINING = 4
+# Режим получения апдейтов: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Публичный адрес, который регистрируется в Telegram, например https://bot.example.com
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 8))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+# Лимиты исходящих сообщений (сообщений в секунду) и запас на всплеск
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", 25))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", 1))
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", 3))
+SEND_GROUP_RATE = float(os.getenv("SEND_GROUP_RATE", 20 / 60))
+SEND_GROUP_BURST = float(os.getenv("SEND_GROUP_BURST", 3))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", 3))
+# Сколько локаций показываем на одной странице списка
+LOCATIONS_PAGE_SIZE = int(os.getenv("LOCATIONS_PAGE_SIZE", 10))
+GROUPS_PAGE_SIZE = int(os.getenv("GROUPS_PAGE_SIZE", 10))
@@ -3,12 +3,19 @@
 from telebot import TeleBot
 from telebot.types import CallbackQuery, Message
 import logging
-from config import BOT_NAME
-from utils.api import api_get, api_post, api_delete, handle_api_error
+from config import BOT_NAME, GROUPS_PAGE_SIZE
+from utils.api import (
+    api_get,
+    api_post,
+    api_delete,
+    handle_api_error,
+    page_endpoint,
+)
 from utils.states import AddGroupState
+from utils.sender import sender
 from keyboards.inline import (
     admin_groups_keyboard,
-    user_groups_keyboard,
+    user_groups_page,
     delete_group_button,
     MAIN_MENU,
     add_comm_main_menu,
@@ -19,16 +26,17 @@ logger = logging.getLogger(__name__)
 
 def register_handlers(bot: TeleBot):
 
-    @bot.callback_query_handler(func=lambda call: call.data == "my_groups")
-    def show_user_groups(call: CallbackQuery):
-        username = call.from_user.username
-        bot.answer_callback_query(call.id)
-
-        groups = api_get(f"users/{username}/groups")
-        if groups is None:
+    def show_user_groups_page(call: CallbackQuery, cursor: str = None):
+        result, e = api_get(
+            page_endpoint(f"user/{call.from_user.id}/groups", GROUPS_PAGE_SIZE, cursor)
+        )
+        if e:
             handle_api_error(bot, call.message.chat.id, call.message.message_id)
             return
 
+        groups = result["data"]
+        if not groups and cursor:
+            return show_user_groups_page(call)
         if not groups:
             bot.edit_message_text(
                 add_comm_main_menu(
@@ -40,37 +48,37 @@ def register_handlers(bot: TeleBot):
             )
             return
 
-        bot.edit_message_text(
-            "Ваши группы:", call.message.chat.id, call.message.message_id
+        text, markup = user_groups_page(groups, result["paging"])
+        sender.edit_message_text(
+            bot, text, call.message.chat.id, call.message.message_id, reply_markup=markup
         )
-        for group in groups:
-            bot.send_message(
-                call.message.chat.id,
-                f"📌 Группа: <b>{group['title']}</b>",
-                # TODO сделать ссылку на карту группы
-                # LinkGroup = f'{API_URL}/{group["id"]}'
-                # f"📌 Группа: <b>{group['title']}</b>\n 🗺️ карта группы: {LinkGroup}"
-                reply_markup=user_groups_keyboard(group["id"]),
-            )
-        bot.send_message(call.message.chat.id, MAIN_MENU)
+
+    @bot.callback_query_handler(func=lambda call: call.data == "my_groups")
+    def show_user_groups(call: CallbackQuery):
+        bot.answer_callback_query(call.id)
+        show_user_groups_page(call)
+
+    @bot.callback_query_handler(
+        func=lambda call: call.data.startswith(("my_groups_after_", "my_groups_before_"))
+    )
+    def show_user_groups_more(call: CallbackQuery):
+        bot.answer_callback_query(call.id)
+        show_user_groups_page(call, call.data.split("_", 2)[2])
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith("leave_group_"))
     def leave_group(call: CallbackQuery):
         bot.answer_callback_query(call.id)
         group_id = call.data.split("_")[-1]
-        username = call.from_user.username
 
-        result = api_delete(f"leave-group/{group_id}", {"telegram_login": username})
+        result, e = api_delete(
+            f"group/{group_id}/leave", {"telegram_id": call.from_user.id}
+        )
 
-        if result is None:
+        if e and e.status_code is None:
             handle_api_error(bot, call.message.chat.id, call.message.message_id)
             return
 
-        msg = (
-            result.get("message", "Ошибка при выходе из группы.")
-            if result
-            else "Неизвестная ошибка"
-        )
+        msg = result["message"] if result else e.message
         bot.edit_message_text(
             add_comm_main_menu(msg), call.message.chat.id, call.message.message_id
         )
@@ -88,14 +96,14 @@ def register_handlers(bot: TeleBot):
 
     @bot.callback_query_handler(func=lambda call: call.data == "list_managed_groups")
     def list_managed_groups(call: CallbackQuery):
-        username = call.from_user.username
         bot.answer_callback_query(call.id)
 
-        groups = api_get(f"admin-groups/{username}")
-        if groups is None:
+        result, e = api_get(f"user/{call.from_user.id}/admin-groups")
+        if e:
             handle_api_error(bot, call.message.chat.id, call.message.message_id)
             return
 
+        groups = result["data"]
         if not groups:
             bot.edit_message_text(
                 add_comm_main_menu("У вас нет групп, которыми вы управляете."),
@@ -111,8 +119,12 @@ def register_handlers(bot: TeleBot):
         )
         for group in groups:
             link = f"https://t.me/{BOT_NAME}?start=join_{group['group_link']}"
-            text = f"📍 <b>{group['title']}</b>\n🔗 Ссылка для приглашения: {link}"
-            bot.send_message(
+            text = (
+                f"📍 <b>{group['title']}</b>\n🔗 Ссылка для приглашения: {link}"
+                f"\n👥 Участников: {group['members_count']}"
+            )
+            sender.send_message(
+                bot,
                 call.message.chat.id,
                 text,
                 reply_markup=delete_group_button(group["id"]),
@@ -121,27 +133,21 @@ def register_handlers(bot: TeleBot):
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith("delete_group_"))
     def delete_group(call: CallbackQuery):
+        bot.answer_callback_query(call.id)
         group_id = call.data.split("_")[-1]
-        username = call.from_user.username
 
-        result = api_delete(f"delete-group/{group_id}/{username}")
+        result, e = api_delete(
+            f"group/{group_id}/delete", {"telegram_id": call.from_user.id}
+        )
 
-        if result is None:
+        if e and e.status_code is None:
             handle_api_error(bot, call.message.chat.id, call.message.message_id)
             return
 
-        if result:
-            bot.edit_message_text(
-                add_comm_main_menu("Группа удалена."),
-                call.message.chat.id,
-                call.message.message_id,
-            )
-        else:
-            bot.edit_message_text(
-                add_comm_main_menu("Ошибка при удалении группы."),
-                call.message.chat.id,
-                call.message.message_id,
-            )
+        msg = "Группа удалена." if result else e.message
+        bot.edit_message_text(
+            add_comm_main_menu(msg), call.message.chat.id, call.message.message_id
+        )
 
     @bot.callback_query_handler(func=lambda call: call.data == "add_manage_group")
     def add_group_title(call: CallbackQuery):
@@ -155,27 +161,21 @@ def register_handlers(bot: TeleBot):
 
     @bot.message_handler(state=AddGroupState.title)
     def receive_group_title(message: Message):
-        title = message.text
-        username = message.from_user.username
+        payload = {"telegram_id": message.from_user.id, "title": message.text}
 
-        payload = {"title": title, "telegram_login": username}
-
-        result = api_post("add-group", payload)
+        result, e = api_post("group/create", payload)
+        bot.delete_state(message.from_user.id, message.chat.id)
 
-        if result is None:
+        if e and e.status_code is None:
             handle_api_error(bot, message.chat.id)
-            bot.delete_state(message.from_user.id, message.chat.id)
             return
 
-        if "group_link" in result:
-            link = f"https://t.me/{BOT_NAME}?start=join_{result['group_link']}"
-            bot.send_message(
-                message.chat.id, f"Группа создана ✅\n🔗 Ссылка для приглашения: {link}"
-            )
-            bot.send_message(message.chat.id, MAIN_MENU)
-        else:
-            bot.send_message(
-                message.chat.id, add_comm_main_menu("Ошибка при создании группы.")
-            )
+        if e:
+            bot.send_message(message.chat.id, add_comm_main_menu(e.message))
+            return
 
-        bot.delete_state(message.from_user.id, message.chat.id)
+        link = f"https://t.me/{BOT_NAME}?start=join_{result['data']['group_link']}"
+        bot.send_message(
+            message.chat.id, f"Группа создана ✅\n🔗 Ссылка для приглашения: {link}"
+        )
+        bot.send_message(message.chat.id, MAIN_MENU)
@@ -3,19 +3,20 @@
 from telebot import TeleBot
 from telebot.types import CallbackQuery, Message
 import logging
-from config import FINAL_STAGE_TRAINING
+from config import FINAL_STAGE_TRAINING, LOCATIONS_PAGE_SIZE
 from utils.api import (
     api_get,
-    api_post,
     api_delete,
     handle_api_error,
-    get_training_stage,
-    update_training_stage,
+    page_endpoint,
+    APIBatch,
 )
-from utils.states import AddLocationState
+from utils.states import AddLocationState, UserStorage
+from utils.sender import sender
 from keyboards.inline import (
     location_action_keyboard,
     add_another_location,
+    locations_page,
     main_menu_keyboard,
 )
 from utils.texts import main_message
@@ -50,35 +51,55 @@ def register_handlers(bot: TeleBot):
             reply_markup=location_action_keyboard(),
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "list_locations")
-    def list_user_locations(call: CallbackQuery):
-        bot.answer_callback_query(call.id)
-
-        result, e = api_get(f"user/{call.from_user.id}/locations")
+    def show_locations_page(call: CallbackQuery, cursor: str, edit: bool):
+        result, e = api_get(
+            page_endpoint(
+                f"user/{call.from_user.id}/locations", LOCATIONS_PAGE_SIZE, cursor
+            )
+        )
 
         if e:
             handle_api_error(bot, call.message.chat.id, call.message.message_id)
             return
         locations = result["data"]
+        if not locations and cursor:
+            # Страницу успели удалить целиком — показываем начало списка
+            return show_locations_page(call, None, edit)
         if not locations:
-            bot.send_message(
+            sender.send_message(
+                bot,
                 call.message.chat.id,
                 "У вас нет сохранённых локаций.",
                 reply_markup=add_another_location(call.from_user),
             )
             return
 
-        bot.send_message(
-            call.message.chat.id,
-            "Ваши локации:",
-        )
-        for loc in locations:
-            text = f"📍 <b>{loc['description']}</b>\nКоординаты: ({loc['latitude']}, {loc['longitude']})"
-            keyboard = location_action_keyboard(loc["id"])
-            bot.send_message(call.message.chat.id, text, reply_markup=keyboard)
-        bot.send_message(
-            call.message.chat.id, "Что ты хочешь сделать дальше?", reply_markup=add_another_location(call.from_user)
-        )
+        # Одна страница из API одним сообщением, следующая — по кнопке
+        text, markup = locations_page(locations, result["paging"], "Ваши локации:")
+        if edit:
+            sender.edit_message_text(
+                bot,
+                text,
+                call.message.chat.id,
+                call.message.message_id,
+                reply_markup=markup,
+            )
+        else:
+            sender.send_message(
+                bot, call.message.chat.id, text, reply_markup=markup
+            )
+
+    @bot.callback_query_handler(func=lambda call: call.data == "list_locations")
+    def list_user_locations(call: CallbackQuery):
+        bot.answer_callback_query(call.id)
+        show_locations_page(call, None, edit=False)
+
+    @bot.callback_query_handler(
+        func=lambda call: call.data.startswith(("locations_after_", "locations_before_"))
+    )
+    def list_user_locations_page(call: CallbackQuery):
+        bot.answer_callback_query(call.id)
+        show_locations_page(call, call.data.split("_", 1)[1], edit=True)
 
     @bot.callback_query_handler(
         func=lambda call: call.data.startswith("delete_location_")
@@ -192,22 +213,28 @@ def register_handlers(bot: TeleBot):
                 "longitude": longitude,
             }
 
-            result, e = api_post("location/add", payload)
+            # Локация и этап обучения одним запросом и одной транзакцией
+            batch = APIBatch()
+            batch.add("location.add", **payload)
+            stage_index = batch.add(
+                "user.update_training_stage",
+                telegram_id=message.from_user.id,
+                new_training_stage=3,
+                at_least=True,
+            )
+            results, e = batch.send()
 
             if e:
                 handle_api_error(bot, message.chat.id)
                 return
 
-            training_stage = get_training_stage(bot, message.from_user, message.chat.id)
+            training_stage = results[stage_index]["training_stage"]
+            # Меню ниже возьмет этап из кэша, без еще одного запроса
+            UserStorage(bot, message.from_user.id, message.chat.id).set_training_stage(
+                training_stage
+            )
 
             if training_stage < FINAL_STAGE_TRAINING:
-                if training_stage < 3:
-                    training_stage = 3
-                    training_stage, error = update_training_stage(
-                        bot, message.from_user.id, training_stage, message.chat.id
-                    )
-                    if error:
-                        return
                 bot.send_message(
                     message.chat.id,
                     text=main_message(training_stage).format(
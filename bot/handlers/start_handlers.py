@@ -28,9 +28,8 @@ def register_handlers(bot: TeleBot):
     @bot.message_handler(commands=["start", "main"])
     def handle_start(message: Message):
         user_tg = message.from_user
-        # storage = UserStorage(bot, user_tg.id, message.chat.id)
-        # Если training_stage есть, то мы уже получали пользователя, т.е. он есть уже в базе
-        # training_stage = storage.get_data("training_stage")
+        # Если training_stage есть в кэше, то мы уже получали пользователя,
+        # т.е. он есть уже в базе, и запроса к API не будет
 
         training_stage = get_training_stage(bot, user_tg, message.chat.id)
         args = message.text.split()
@@ -1,7 +1,7 @@
 from telebot.types import Message, ReplyKeyboardRemove, CallbackQuery
 from telebot import TeleBot
 import logging
-from config import FINAL_STAGE_TRAINING
+from config import FINAL_STAGE_TRAINING, LOCATIONS_PAGE_SIZE
 from utils.texts import (
     main_message,
     MAIN_MESSAGE_S4_FiNAL_TRANING,
@@ -10,11 +10,13 @@ from utils.api import (
     api_get,
     handle_api_error,
     update_training_stage,
+    page_endpoint,
 )
 from keyboards.inline import (
     main_menu_keyboard,
-    location_action_keyboard,
+    locations_page,
 )
+from utils.sender import sender
 
 
 logger = logging.getLogger(__name__)
@@ -105,7 +107,9 @@ def register_handlers(bot: TeleBot):
     def training_list_locations(call: CallbackQuery):
         bot.answer_callback_query(call.id)
 
-        result, e = api_get(f"user/{call.from_user.id}/locations")
+        result, e = api_get(
+            page_endpoint(f"user/{call.from_user.id}/locations", LOCATIONS_PAGE_SIZE)
+        )
 
         if e:
             handle_api_error(bot, call.message.chat.id, call.message.message_id)
@@ -120,14 +124,8 @@ def register_handlers(bot: TeleBot):
             training_add_location(call)
             return
 
-        bot.send_message(
-            call.message.chat.id,
-            "Твои локации:",
-        )
-        for loc in locations:
-            text = f"📍 <b>{loc['description']}</b>\nКоординаты: ({loc['latitude']}, {loc['longitude']})"
-            keyboard = location_action_keyboard(loc["id"])
-            bot.send_message(call.message.chat.id, text, reply_markup=keyboard)
+        text, markup = locations_page(locations, result["paging"], "Твои локации:")
+        sender.send_message(bot, call.message.chat.id, text, reply_markup=markup)
         training_stage = FINAL_STAGE_TRAINING
         training_stage, error = update_training_stage(
             bot, call.from_user.id, training_stage, call.message.chat.id
@@ -1,7 +1,9 @@
 # keyboards/inline.py
 from telebot import TeleBot
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, User
-from config import MAP_URL, FINAL_STAGE_TRAINING
+from config import MAP_URL, FINAL_STAGE_TRAINING, LOCATIONS_PAGE_SIZE
+from utils.sender import MESSAGE_MAX_CHARS, pack_pages
+from utils.texts import location_line
 
 
 MAIN_MENU = "/main - Главное меню"
@@ -14,11 +16,13 @@ def add_comm_main_menu(txt: str):
 def main_menu_keyboard(bot: TeleBot, user_tg: User, chat_id):
     from utils.api import get_training_stage
 
-    # storage = UserStorage(bot, user_tg.id, chat_id)
-    # training_stage = storage.get_data("training_stage")
-
+    # Этап берется из кэша UserStorage, к API идем только при промахе
     training_stage = get_training_stage(bot, user_tg, chat_id)
+    return menu_keyboard(user_tg, training_stage)
+
 
+def menu_keyboard(user_tg: User, training_stage: int):
+    """Главное меню для уже известного этапа обучения"""
     if training_stage < FINAL_STAGE_TRAINING:
         return training_keyboard(user_tg, training_stage)
 
@@ -125,22 +129,91 @@ def location_action_keyboard(location_id: str = None):
     return markup
 
 
-def admin_groups_keyboard():
-    markup = InlineKeyboardMarkup()
+def pager_row(prefix: str, paging: dict):
+    """
+    Кнопки листания по курсорам API: callback_data вида
+    {prefix}before_{id} и {prefix}after_{id}, см. utils.api.page_endpoint
+    """
+    buttons = []
+    if paging.get("prev_cursor"):
+        buttons.append(
+            InlineKeyboardButton("◀️", callback_data=f"{prefix}before_{paging['prev_cursor']}")
+        )
+    if paging.get("next_cursor"):
+        buttons.append(
+            InlineKeyboardButton("▶️", callback_data=f"{prefix}after_{paging['next_cursor']}")
+        )
+    return buttons
+
+
+def locations_page(locations: list, paging: dict, title: str):
+    """
+    Текст и клавиатура страницы списка локаций, полученной из API:
+    все локации страницы одним сообщением, под ним кнопки удаления и листания.
+    """
+    numbered = list(enumerate(locations, start=1))
+    pages = pack_pages(
+        numbered,
+        lambda item: location_line(*item),
+        LOCATIONS_PAGE_SIZE,
+        MESSAGE_MAX_CHARS - len(title) - 1,
+    )
+    shown = pages[0]
+    if len(pages) > 1:
+        # Страница API не влезла в сообщение: остаток покажем следующей
+        paging = dict(paging, next_cursor=shown[-1][1]["id"])
+
+    lines = [title]
+    markup = InlineKeyboardMarkup(row_width=1)
+    for number, location in shown:
+        lines.append(location_line(number, location))
+        markup.add(
+            InlineKeyboardButton(
+                f"🗑 Удалить {number}", callback_data=f"delete_location_{location['id']}"
+            )
+        )
+    pager = pager_row("locations_", paging)
+    if pager:
+        markup.row(*pager)
     markup.add(
-        InlineKeyboardButton("Список моих групп", callback_data="list_managed_groups"),
-        InlineKeyboardButton("Добавить новую группу", callback_data="add_manage_group"),
+        InlineKeyboardButton("Добавить локацию 📍", callback_data="add_location"),
+        InlineKeyboardButton("Главное меню 🏠", callback_data="main_menu"),
     )
-    return markup
+    return "\n".join(lines), markup
 
 
-def user_groups_keyboard(group_id: str):
+def group_map_url(group_id) -> str:
+    """Карта только с точками участников группы"""
+    return f"{MAP_URL}?group={group_id}"
+
+
+def user_groups_page(groups: list, paging: dict):
+    """Страница групп пользователя одним сообщением с кнопками карты и выхода"""
+    lines = ["Ваши группы:"]
+    markup = InlineKeyboardMarkup(row_width=1)
+    for group in groups:
+        lines.append(f"📌 Группа: <b>{group['title']}</b>")
+        markup.row(
+            InlineKeyboardButton(
+                f"🌍 Карта «{group['title']}»", url=group_map_url(group["id"])
+            ),
+            InlineKeyboardButton(
+                f"Выйти из «{group['title']}»",
+                callback_data=f"leave_group_{group['id']}",
+            ),
+        )
+    pager = pager_row("my_groups_", paging)
+    if pager:
+        markup.row(*pager)
+    markup.add(InlineKeyboardButton("Главное меню 🏠", callback_data="main_menu"))
+    return "\n".join(lines), markup
+
+
+def admin_groups_keyboard():
     markup = InlineKeyboardMarkup()
     markup.add(
-        InlineKeyboardButton(
-            "Выйти из группы",
-            callback_data=f"leave_group_{group_id}",
-        )
+        InlineKeyboardButton("Список моих групп", callback_data="list_managed_groups"),
+        InlineKeyboardButton("Добавить новую группу", callback_data="add_manage_group"),
     )
     return markup
 
@@ -9,6 +9,17 @@ from dotenv import load_dotenv
 import os
 
 from handlers import start_handlers, location_handlers, group_handlers, training_handlers
+from config import (
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE,
+)
+from utils.webhook import UpdateDispatcher, create_app, serve
 
 # from utils.states import AddLocationState, AddGroupState
 
@@ -36,8 +47,14 @@ except Exception as e:
 
 # storage.state_ttl = 300  # ⏱ 5 минут
 # storage.update_types = ['message', 'callback_query', 'edited_message']
+# В режиме вебхука апдейты обрабатывает пул UpdateDispatcher,
+# собственные потоки telebot не нужны
 bot = telebot.TeleBot(
-    BOT_TOKEN, state_storage=storage, use_class_middlewares=True, parse_mode="HTML"
+    BOT_TOKEN,
+    state_storage=storage,
+    use_class_middlewares=True,
+    parse_mode="HTML",
+    threaded=BOT_MODE != "webhook",
 )
 # bot.setup_middleware(storage)
 
@@ -51,6 +68,22 @@ training_handlers.register_handlers(bot)
 
 
 # Запуск бота
+def run_webhook():
+    dispatcher = UpdateDispatcher(bot, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE)
+    dispatcher.start()
+    if WEBHOOK_URL:
+        bot.remove_webhook()
+        bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET
+        )
+    else:
+        logger.warning("WEBHOOK_URL не задан, вебхук в Telegram не регистрируется")
+    serve(create_app(dispatcher, WEBHOOK_PATH, WEBHOOK_SECRET), WEBHOOK_HOST, WEBHOOK_PORT)
+
+
 if __name__ == "__main__":
-    logger.info("Бот запущен...")
-    bot.infinity_polling()
+    logger.info(f"Бот запущен ({BOT_MODE})...")
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        bot.infinity_polling()
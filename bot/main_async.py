@@ -0,0 +1,67 @@
+# main_async.py
+"""
+Асинхронный запуск бота на AsyncTeleBot: обработчики не держат поток
+на время запросов к API и Telegram, все апдейты обслуживает один event loop.
+Обработчики и поведение те же, что у main.py (см. async_handlers/).
+"""
+import asyncio
+import logging
+from telebot.async_telebot import AsyncTeleBot
+from telebot import asyncio_filters
+from telebot.asyncio_storage import StateRedisStorage, StateMemoryStorage
+from dotenv import load_dotenv
+import os
+
+from async_handlers import (
+    start_handlers,
+    location_handlers,
+    group_handlers,
+    training_handlers,
+)
+from utils.async_api import api_client
+
+# Загрузка переменных окружения
+load_dotenv()
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def create_storage():
+    try:
+        storage = StateRedisStorage(host=REDIS_HOST, port=REDIS_PORT, db=0, prefix="fsm")
+        await storage.redis.ping()
+        return storage
+    except Exception as e:
+        logger.error(f"Ошибка Redis: {e}")
+        return StateMemoryStorage()
+
+
+async def main():
+    storage = await create_storage()
+    bot = AsyncTeleBot(BOT_TOKEN, state_storage=storage, parse_mode="HTML")
+    bot.add_custom_filter(asyncio_filters.StateFilter(bot))
+
+    # Регистрация всех обработчиков
+    start_handlers.register_handlers(bot)
+    location_handlers.register_handlers(bot)
+    group_handlers.register_handlers(bot)
+    training_handlers.register_handlers(bot)
+
+    logger.info("Бот запущен (asyncio)...")
+    try:
+        await bot.infinity_polling()
+    finally:
+        await api_client.close()
+        await bot.close_session()
+
+
+# Запуск бота
+if __name__ == "__main__":
+    asyncio.run(main())
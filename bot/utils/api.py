@@ -2,10 +2,15 @@
 
 import requests
 import logging
-from config import API_URL, TIMEOUT
+import re
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from config import API_URL, TIMEOUT, API_CONNECT_TIMEOUT, API_POOL_SIZE
 from telebot import TeleBot
 from telebot.types import User
 from keyboards.inline import add_comm_main_menu
+from utils.states import UserStorage
 from typing import Tuple, Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
@@ -65,47 +70,151 @@ def handle_api_error(
         bot.send_message(chat_id, full_msg)
 
 
+class LatencyStats:
+    """Количество, ошибки и задержки запросов к API по эндпоинтам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+
+    def record(self, method: str, endpoint: str, started: float, failed: bool):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # user/123/locations -> user/{id}/locations, чтобы не плодить ключи
+        path = endpoint.split("?", 1)[0].strip("/")
+        key = f"{method} " + re.sub(r"\d+", "{id}", path)
+        with self._lock:
+            stat = self._latency.setdefault(
+                key, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            stat["count"] += 1
+            stat["errors"] += failed
+            stat["total_ms"] += elapsed_ms
+            stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                key: dict(stat, avg_ms=stat["total_ms"] / stat["count"])
+                for key, stat in self._latency.items()
+            }
+
+
+class APIClient:
+    """
+    HTTP-клиент к API с общим пулом keep-alive соединений: запросы
+    обработчиков переиспользуют открытые TCP-соединения вместо нового
+    на каждый вызов. Собирает задержки по эндпоинтам.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = API_POOL_SIZE,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        read_timeout: float = TIMEOUT,
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # Один хост API, поэтому один пул; сверх pool_size соединения
+        # открываются, но не возвращаются в пул
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.latency = LatencyStats()
+
+    def request(self, method: str, endpoint: str, payload: dict = None):
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, url, json=payload, timeout=self.timeout
+            )
+            self.latency.record(method, endpoint, started, failed=False)
+            return _process_response(response)
+        except Exception as e:
+            self.latency.record(method, endpoint, started, failed=True)
+            log_data = {"method": method, "url": url, "error": str(e)}
+            if payload:
+                log_data["payload"] = payload
+            logger.error(f"API request failed: {log_data}")
+            return None, APIError(f"Connection error: {str(e)}")
+
+    def stats(self) -> dict:
+        """Задержки по эндпоинтам и заполненность пула соединений"""
+        pools = {}
+        poolmanager_pools = self.adapter.poolmanager.pools
+        for pool_key in poolmanager_pools.keys():
+            pool = poolmanager_pools.get(pool_key)
+            if pool is None:
+                continue
+            pools[f"{pool_key.key_host}:{pool_key.key_port}"] = {
+                "opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool else 0,
+                "maxsize": pool.pool.maxsize if pool.pool else 0,
+            }
+        return {"endpoints": self.latency.snapshot(), "pools": pools}
+
+
+api_client = APIClient(API_URL)
+
+
+def page_endpoint(endpoint: str, limit: int, cursor: str = None) -> str:
+    """
+    Эндпоинт страницы списка. cursor — хвост callback_data от
+    keyboards.inline.pager_row: "after_<id>" или "before_<id>".
+    """
+    query = f"limit={limit}"
+    if cursor:
+        direction, _, key = cursor.partition("_")
+        query += f"&{'before' if direction == 'before' else 'cursor'}={int(key)}"
+    return f"{endpoint}?{query}"
+
+
 def api_get(endpoint: str):
-    url = f"{API_URL.rstrip('/')}/{endpoint.lstrip('/')}"
-    try:
-        response = requests.get(url, timeout=TIMEOUT)
-        return _process_response(response)
-    except Exception as e:
-        log_data = {"method": "GET", "url": url, "error": str(e)}
-        logger.error(f"API request failed: {log_data}")
-        return None, APIError(f"Connection error: {str(e)}")
+    return api_client.request("GET", endpoint)
 
 
 def api_post(endpoint: str, payload: dict):
-    url = f"{API_URL.rstrip('/')}/{endpoint.lstrip('/')}"
-    try:
-        response = requests.post(url, json=payload, timeout=TIMEOUT)
-        return _process_response(response)
-    except Exception as e:
-        log_data = {
-            "method": "POST",
-            "url": url,
-            "error": str(e),
-            "payload": payload if payload else None,
-        }
-        logger.error(f"API request failed: {log_data}")
-        return None, APIError(f"Connection error: {str(e)}")
+    return api_client.request("POST", endpoint, payload)
 
 
 def api_delete(endpoint: str, payload: dict = None):
-    url = f"{API_URL.rstrip('/')}/{endpoint.lstrip('/')}"
-    try:
-        response = requests.delete(url, json=payload, timeout=TIMEOUT)
-        return _process_response(response)
-    except Exception as e:
-        log_data = {
-            "method": "DELETE",
-            "url": url,
-            "error": str(e),
-            "payload": payload if payload else None,
-        }
-        logger.error(f"API request failed: {log_data}")
-        return None, APIError(f"Connection error: {str(e)}")
+    return api_client.request("DELETE", endpoint, payload)
+
+
+def get_api_stats() -> dict:
+    return api_client.stats()
+
+
+class APIBatch:
+    """
+    Несколько операций API одним запросом /api/batch и одной транзакцией.
+    Операции копятся через add(), уходят в send(); результат — список
+    data операций в порядке добавления. Если падает любая, не применяется ни одна.
+    """
+
+    def __init__(self):
+        self.operations = []
+
+    def add(self, op: str, **params) -> int:
+        """Добавляет операцию и возвращает ее индекс в результате"""
+        self.operations.append({"op": op, "params": params})
+        return len(self.operations) - 1
+
+    def payload(self) -> dict:
+        return {"operations": self.operations}
+
+    @staticmethod
+    def results(response: Optional[Dict]) -> list:
+        return [item["data"] for item in response["data"]]
+
+    def send(self):
+        response, error = api_post("batch", self.payload())
+        if error:
+            return None, error
+        return self.results(response), None
 
 
 def update_training_stage(bot, telegram_id, new_training_stage, chat_id):
@@ -120,16 +229,19 @@ def update_training_stage(bot, telegram_id, new_training_stage, chat_id):
             None,
             "Не удалось обновить этап обучения",
         )
-        return
+        return None, error
 
+    # Кэш обновляем сразу: следующие отрисовки меню обойдутся без API
+    UserStorage(bot, telegram_id, chat_id).set_training_stage(new_training_stage)
     return new_training_stage, None
 
 
 def get_training_stage(bot: TeleBot, user_tg: User, chat_id):
-    # with bot.retrieve_data(user_tg.id, chat_id) as data:
-    #     training_stage = data.get("training_stage")
+    storage = UserStorage(bot, user_tg.id, chat_id)
+    training_stage = storage.get_training_stage()
+    if training_stage is not None:
+        return training_stage
 
-    # if training_stage is None:
     user_data, error = get_or_create_user(user_tg)
     if error:
         handle_api_error(
@@ -140,9 +252,7 @@ def get_training_stage(bot: TeleBot, user_tg: User, chat_id):
         )
         return
     training_stage = user_data.training_stage
-    # storage.set_data("training_stage", training_stage)
-    # with bot.retrieve_data(user_tg.id, chat_id) as data:
-    #     data["training_stage"] = training_stage
+    storage.set_training_stage(training_stage)
 
     return training_stage
 
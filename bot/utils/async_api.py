@@ -0,0 +1,205 @@
+# utils/async_api.py
+"""
+Асинхронные аналоги utils/api.py для рантайма на AsyncTeleBot
+(main_async.py). Ответы и ошибки в том же формате: (data, None) или (None, APIError).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple, Dict
+
+import aiohttp
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import User
+
+from config import API_URL, TIMEOUT, API_CONNECT_TIMEOUT, API_POOL_SIZE
+from keyboards.inline import add_comm_main_menu, menu_keyboard
+from utils.api import APIError, LatencyStats, UserData, page_endpoint  # noqa: F401
+from utils.api import APIBatch as SyncAPIBatch
+from utils.states import AsyncUserStorage
+
+logger = logging.getLogger(__name__)
+
+
+async def _process_response(
+    response: aiohttp.ClientResponse,
+) -> Tuple[Optional[Dict], Optional[APIError]]:
+    """Обрабатывает ответ API в стандартном формате"""
+    try:
+        data = await response.json(content_type=None)
+    except ValueError:
+        return None, APIError("Invalid JSON response", response.status)
+
+    if response.status >= 400:
+        error_msg = data.get("message", "Unknown error")
+        details = data.get("details")
+        return None, APIError(error_msg, response.status, details)
+
+    return data, None
+
+
+class AsyncAPIClient:
+    """
+    Асинхронный HTTP-клиент к API на aiohttp с пулом keep-alive соединений.
+    Сессия создается при первом запросе, внутри работающего event loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = API_POOL_SIZE,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        read_timeout: float = TIMEOUT,
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.pool_size = pool_size
+        # sock_connect, а не connect: connect включает ожидание свободного
+        # соединения пула, и при всплеске апдейтов запросы в очереди
+        # падали бы по таймауту, не дойдя до API
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.latency = LatencyStats()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.timeout,
+            )
+        return self.session
+
+    async def request(self, method: str, endpoint: str, payload: dict = None):
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        started = time.perf_counter()
+        try:
+            async with self._get_session().request(
+                method, url, json=payload
+            ) as response:
+                result = await _process_response(response)
+            self.latency.record(method, endpoint, started, failed=False)
+            return result
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.latency.record(method, endpoint, started, failed=True)
+            log_data = {"method": method, "url": url, "error": str(e)}
+            if payload:
+                log_data["payload"] = payload
+            logger.error(f"API request failed: {log_data}")
+            return None, APIError(f"Connection error: {str(e)}")
+
+    def stats(self) -> dict:
+        return {"endpoints": self.latency.snapshot()}
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+api_client = AsyncAPIClient(API_URL)
+
+
+async def api_get(endpoint: str):
+    return await api_client.request("GET", endpoint)
+
+
+async def api_post(endpoint: str, payload: dict):
+    return await api_client.request("POST", endpoint, payload)
+
+
+async def api_delete(endpoint: str, payload: dict = None):
+    return await api_client.request("DELETE", endpoint, payload)
+
+
+class APIBatch(SyncAPIBatch):
+    """Асинхронный вариант utils.api.APIBatch"""
+
+    async def send(self):
+        response, error = await api_post("batch", self.payload())
+        if error:
+            return None, error
+        return self.results(response), None
+
+
+async def handle_api_error(
+    bot: AsyncTeleBot, chat_id: int, message_id: int = None, text: str = None
+) -> None:
+    """Универсальная обработка ошибок API, см. utils.api.handle_api_error"""
+    error_msg = "⚠️ Ошибка соединения с сервером. Попробуйте позже."
+    full_msg = f"{text}\n{error_msg}" if text else error_msg
+    full_msg = add_comm_main_menu(full_msg)
+    if message_id:
+        try:
+            await bot.edit_message_text(
+                chat_id=chat_id, message_id=message_id, text=full_msg
+            )
+        except Exception as e:
+            logger.error(f"Не удалось исправить собщение: {e}")
+            await bot.send_message(chat_id, full_msg)
+    else:
+        await bot.send_message(chat_id, full_msg)
+
+
+async def update_training_stage(bot, telegram_id, new_training_stage, chat_id):
+    api_response_user, error = await api_post(
+        "user/update_training_stage",
+        {"telegram_id": telegram_id, "new_training_stage": new_training_stage},
+    )
+    if error:
+        await handle_api_error(
+            bot,
+            chat_id,
+            None,
+            "Не удалось обновить этап обучения",
+        )
+        return None, error
+
+    await AsyncUserStorage(bot, telegram_id, chat_id).set_training_stage(
+        new_training_stage
+    )
+    return new_training_stage, None
+
+
+async def get_training_stage(bot: AsyncTeleBot, user_tg: User, chat_id):
+    storage = AsyncUserStorage(bot, user_tg.id, chat_id)
+    training_stage = await storage.get_training_stage()
+    if training_stage is not None:
+        return training_stage
+
+    user_data, error = await get_or_create_user(user_tg)
+    if error:
+        await handle_api_error(
+            bot,
+            chat_id,
+            None,
+            "Не удалось зарегистрировать пользователя",
+        )
+        return
+    training_stage = user_data.training_stage
+    await storage.set_training_stage(training_stage)
+
+    return training_stage
+
+
+async def get_or_create_user(tg_user: User):
+    """Получает или создает пользователя через API, см. utils.api.get_or_create_user"""
+    api_response, error = await api_post(
+        "user/add",
+        {
+            "telegram_id": tg_user.id,
+            "username": tg_user.username,
+            "first_name": tg_user.first_name,
+        },
+    )
+    if api_response is None:
+        return None, error
+
+    training_stage = api_response["data"]["training_stage"]
+    return UserData(tg_user=tg_user, training_stage=training_stage), None
+
+
+async def main_menu_keyboard(bot: AsyncTeleBot, user_tg: User, chat_id):
+    """Асинхронный аналог keyboards.inline.main_menu_keyboard"""
+    training_stage = await get_training_stage(bot, user_tg, chat_id)
+    return menu_keyboard(user_tg, training_stage)
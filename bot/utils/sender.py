@@ -0,0 +1,182 @@
+# utils/sender.py
+"""
+Исходящие сообщения в Telegram с ограничением частоты.
+
+Telegram ограничивает отправку: около 30 сообщений в секунду на бота,
+около одного в секунду в личный чат и 20 в минуту в группу. При
+превышении API отвечает 429 с retry_after. Здесь лимиты соблюдаются
+заранее токен-бакетами (общий и на каждый чат), а 429 все равно
+обрабатывается повтором через retry_after.
+
+Для длинных списков есть pack_pages: вместо сообщения на каждый
+элемент список упаковывается в страницы, которые листаются кнопками.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from telebot.apihelper import ApiTelegramException
+from telebot.asyncio_helper import ApiTelegramException as AsyncApiTelegramException
+
+from config import (
+    SEND_GLOBAL_RATE,
+    SEND_CHAT_RATE,
+    SEND_CHAT_BURST,
+    SEND_GROUP_RATE,
+    SEND_GROUP_BURST,
+    SEND_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Лимит длины текста сообщения Telegram
+MESSAGE_MAX_CHARS = 4096
+# Сколько бакетов чатов держим, прежде чем выбросить простаивающие
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    """
+    Токен-бакет с резервированием: reserve() сразу забирает токен и
+    возвращает, сколько секунд подождать до отправки. Ожидающие
+    встают в очередь по времени, без опроса в цикле.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def idle(self) -> bool:
+        """Бакет полон — по чату давно ничего не отправляли"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """Общий лимит бота и лимиты отдельных чатов (группы — chat_id < 0)"""
+
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: float = SEND_CHAT_BURST,
+        group_rate: float = SEND_GROUP_RATE,
+        group_burst: float = SEND_GROUP_BURST,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_limits = (chat_rate, chat_burst)
+        self.group_limits = (group_rate, group_burst)
+        self._chats = {}
+        self._lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        with self._lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                if len(self._chats) >= MAX_CHAT_BUCKETS:
+                    self._chats = {
+                        key: value for key, value in self._chats.items() if not value.idle()
+                    }
+                limits = self.group_limits if chat_id < 0 else self.chat_limits
+                bucket = self._chats[chat_id] = TokenBucket(*limits)
+            return bucket
+
+    def reserve(self, chat_id: int) -> float:
+        """Секунды до момента, когда в chat_id можно отправить сообщение"""
+        return max(self.global_bucket.reserve(), self._chat_bucket(chat_id).reserve())
+
+
+def _retry_after(e: Exception):
+    if getattr(e, "error_code", None) != 429:
+        return None
+    parameters = (getattr(e, "result_json", None) or {}).get("parameters") or {}
+    return parameters.get("retry_after", 1)
+
+
+class MessageSender:
+    """
+    Отправка через лимитер с повтором на 429. Вызовы блокируют поток
+    обработчика на время ожидания, поэтому сообщения одного чата
+    уходят в том порядке, в котором их отправили.
+    """
+
+    def __init__(self, limiter: RateLimiter, max_retries: int = SEND_MAX_RETRIES):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.retries = 0
+
+    def call(self, chat_id: int, method, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.limiter.reserve(chat_id))
+            try:
+                return method(*args, **kwargs)
+            except ApiTelegramException as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(f"Telegram 429 для чата {chat_id}, повтор через {retry_after}с")
+                time.sleep(retry_after)
+
+    def send_message(self, bot, chat_id: int, text: str, **kwargs):
+        return self.call(chat_id, bot.send_message, chat_id, text, **kwargs)
+
+    def edit_message_text(self, bot, text: str, chat_id: int, message_id: int, **kwargs):
+        return self.call(chat_id, bot.edit_message_text, text, chat_id, message_id, **kwargs)
+
+
+class AsyncMessageSender(MessageSender):
+    """То же для AsyncTeleBot: ожидание не блокирует event loop"""
+
+    async def call(self, chat_id: int, method, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.limiter.reserve(chat_id))
+            try:
+                return await method(*args, **kwargs)
+            except AsyncApiTelegramException as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(f"Telegram 429 для чата {chat_id}, повтор через {retry_after}с")
+                await asyncio.sleep(retry_after)
+
+
+def pack_pages(items: list, render, max_items: int, max_chars: int = MESSAGE_MAX_CHARS):
+    """
+    Раскладывает items по страницам: не больше max_items элементов и
+    max_chars символов текста (render(item) — строка элемента) на страницу.
+    """
+    pages = []
+    page, size = [], 0
+    for item in items:
+        length = len(render(item)) + 1
+        if page and (len(page) >= max_items or size + length > max_chars):
+            pages.append(page)
+            page, size = [], 0
+        page.append(item)
+        size += length
+    if page:
+        pages.append(page)
+    return pages
+
+
+limiter = RateLimiter()
+sender = MessageSender(limiter)
+async_sender = AsyncMessageSender(limiter)
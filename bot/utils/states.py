@@ -1,6 +1,13 @@
 # utils/states.py
 
+import threading
+import time
 from telebot.handler_backends import State, StatesGroup
+from telebot.storage import StateRedisStorage
+from telebot.asyncio_storage import StateRedisStorage as AsyncStateRedisStorage
+
+# Сколько секунд бот верит закэшированному этапу обучения без запроса к API
+TRAINING_STAGE_TTL = 3600
 
 
 class AddLocationState(StatesGroup):
@@ -12,6 +19,31 @@ class AddGroupState(StatesGroup):
     title = State()
 
 
+# Кэш этапа обучения, если бот работает без Redis: user_id -> (истекает, этап)
+_memory_training_stages = {}
+_memory_lock = threading.Lock()
+
+
+def _training_stage_key(storage, user_id):
+    return f"{storage.prefix}{storage.separator}training_stage{storage.separator}{user_id}"
+
+
+def _get_memory_training_stage(user_id):
+    with _memory_lock:
+        cached = _memory_training_stages.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def _set_memory_training_stage(user_id, training_stage):
+    with _memory_lock:
+        _memory_training_stages[user_id] = (
+            time.monotonic() + TRAINING_STAGE_TTL,
+            training_stage,
+        )
+
+
 class UserStorage:
     def __init__(self, bot, user_id, chat_id):
         self.bot = bot
@@ -47,3 +79,72 @@ class UserStorage:
     def all_data(self):
         with self.bot.retrieve_data(self.user_id, self.chat_id) as data:
             return dict(data)  # возвращаем копию
+
+    # --- Training stage cache ---
+    # Этап обучения относится к пользователю, а не к чату, и переживает
+    # delete_state, поэтому хранится отдельно от данных FSM
+    def get_training_stage(self):
+        """Этап обучения из кэша или None, если его нет или он устарел"""
+        storage = self.bot.current_states
+        if isinstance(storage, StateRedisStorage):
+            value = storage.redis.get(_training_stage_key(storage, self.user_id))
+            return int(value) if value is not None else None
+        return _get_memory_training_stage(self.user_id)
+
+    def set_training_stage(self, training_stage: int):
+        storage = self.bot.current_states
+        if isinstance(storage, StateRedisStorage):
+            storage.redis.set(
+                _training_stage_key(storage, self.user_id),
+                training_stage,
+                ex=TRAINING_STAGE_TTL,
+            )
+            return
+        _set_memory_training_stage(self.user_id, training_stage)
+
+
+class AsyncUserStorage:
+    """То же, что UserStorage, для AsyncTeleBot: все методы — корутины"""
+
+    def __init__(self, bot, user_id, chat_id):
+        self.bot = bot
+        self.user_id = user_id
+        self.chat_id = chat_id
+
+    # --- State ---
+    async def get_state(self):
+        return await self.bot.get_state(self.user_id, self.chat_id)
+
+    async def set_state(self, state):
+        await self.bot.set_state(self.user_id, state, self.chat_id)
+
+    async def delete_state(self):
+        await self.bot.delete_state(self.user_id, self.chat_id)
+
+    # --- Data ---
+    async def get_data(self, key, default=None):
+        async with self.bot.retrieve_data(self.user_id, self.chat_id) as data:
+            return data.get(key, default)
+
+    async def set_data(self, key, value):
+        async with self.bot.retrieve_data(self.user_id, self.chat_id) as data:
+            data[key] = value
+
+    # --- Training stage cache ---
+    async def get_training_stage(self):
+        storage = self.bot.current_states
+        if isinstance(storage, AsyncStateRedisStorage):
+            value = await storage.redis.get(_training_stage_key(storage, self.user_id))
+            return int(value) if value is not None else None
+        return _get_memory_training_stage(self.user_id)
+
+    async def set_training_stage(self, training_stage: int):
+        storage = self.bot.current_states
+        if isinstance(storage, AsyncStateRedisStorage):
+            await storage.redis.set(
+                _training_stage_key(storage, self.user_id),
+                training_stage,
+                ex=TRAINING_STAGE_TTL,
+            )
+            return
+        _set_memory_training_stage(self.user_id, training_stage)
@@ -144,3 +144,10 @@ HELP_MESSAGE = f"""🤖 На данный момент наш бот подде
 <b>"Открыть карту"</b> - откроетcя карта с метками всех участников.
 
 Если вам нужна дополнительная помощь, не стесняйтесь обратиться: {HELP_USERNAMES} 😊✨"""
+
+
+def location_line(number: int, location: dict) -> str:
+    return (
+        f"{number}. 📍 <b>{location['description']}</b>\n"
+        f"Координаты: ({location['latitude']}, {location['longitude']})"
+    )
@@ -0,0 +1,188 @@
+# utils/webhook.py
+"""
+Прием апдейтов Telegram через вебхук.
+
+WSGI-эндпоинт только разбирает JSON и кладет апдейт в очередь, обработку
+ведет фиксированный пул воркеров. Очередей столько же, сколько воркеров,
+апдейт попадает в очередь по chat_id: апдейты одного чата обрабатывает
+всегда один воркер и строго по порядку. Очереди ограничены — при
+переполнении отвечаем 503, и Telegram повторит доставку позже.
+
+Локально проверяется без Telegram: POST записанного Update JSON на /webhook.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from telebot import TeleBot
+from telebot.types import Update
+
+from utils.api import LatencyStats, get_api_stats
+
+logger = logging.getLogger(__name__)
+
+UPDATE_TYPES = (
+    "message",
+    "edited_message",
+    "callback_query",
+    "channel_post",
+    "edited_channel_post",
+    "inline_query",
+    "chosen_inline_result",
+    "my_chat_member",
+    "chat_member",
+)
+
+
+def _update_type(update: dict) -> str:
+    return next((key for key in UPDATE_TYPES if key in update), "other")
+
+
+def _chat_key(update: dict) -> int:
+    """chat_id апдейта, для апдейтов без чата — id пользователя или update_id"""
+    body = update.get(_update_type(update)) or {}
+    chat = body.get("chat") or (body.get("message") or {}).get("chat")
+    if chat:
+        return chat["id"]
+    sender = body.get("from")
+    if sender:
+        return sender["id"]
+    return update.get("update_id", 0)
+
+
+class UpdateDispatcher:
+    """
+    Пул воркеров с очередью на каждого. bot должен быть создан с
+    threaded=False: тогда обработчики выполняются в потоке воркера,
+    и порядок апдейтов внутри чата сохраняется.
+    """
+
+    def __init__(self, bot: TeleBot, workers: int, queue_size: int):
+        self.bot = bot
+        self.queue_size = queue_size
+        self.queues = [
+            queue.Queue(maxsize=max(1, queue_size // workers)) for _ in range(workers)
+        ]
+        self.accepted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.latency = LatencyStats()
+
+    def start(self):
+        for index, updates in enumerate(self.queues):
+            threading.Thread(
+                target=self._work, args=(updates,), name=f"updates-{index}", daemon=True
+            ).start()
+
+    def submit(self, update: dict) -> bool:
+        """Ставит апдейт в очередь; False — очередь полна"""
+        updates = self.queues[_chat_key(update) % len(self.queues)]
+        try:
+            updates.put_nowait((time.perf_counter(), update))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.accepted += 1
+        return True
+
+    def _work(self, updates: queue.Queue):
+        while True:
+            enqueued, update = updates.get()
+            update_type = _update_type(update)
+            # Сколько апдейт ждал в очереди и сколько обрабатывался
+            self.latency.record("wait", update_type, enqueued, failed=False)
+            started = time.perf_counter()
+            failed = False
+            try:
+                self.bot.process_new_updates([Update.de_json(update)])
+            except Exception:
+                failed = True
+                logger.exception(f"Ошибка обработки апдейта {update.get('update_id')}")
+            self.latency.record("process", update_type, started, failed=failed)
+
+    def stats(self) -> dict:
+        depths = [updates.qsize() for updates in self.queues]
+        with self._lock:
+            accepted, rejected = self.accepted, self.rejected
+        return {
+            "workers": len(self.queues),
+            "queue_depth": sum(depths),
+            "queue_depth_by_worker": depths,
+            "queue_capacity": sum(updates.maxsize for updates in self.queues),
+            "accepted": accepted,
+            "rejected": rejected,
+            "updates": self.latency.snapshot(),
+        }
+
+
+def _json_response(start_response, status: str, body: dict):
+    data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    start_response(
+        status,
+        [("Content-Type", "application/json"), ("Content-Length", str(len(data)))],
+    )
+    return [data]
+
+
+def create_app(dispatcher: UpdateDispatcher, path: str = "/webhook", secret: str = None):
+    """
+    WSGI-приложение: POST {path} — прием апдейта, GET /metrics — очереди,
+    задержки обработки и задержки запросов к API.
+    """
+
+    def app(environ, start_response):
+        method = environ["REQUEST_METHOD"]
+        route = environ.get("PATH_INFO", "")
+
+        if route == "/metrics" and method == "GET":
+            return _json_response(
+                start_response,
+                "200 OK",
+                {"updates": dispatcher.stats(), "api": get_api_stats()},
+            )
+
+        if route != path:
+            return _json_response(start_response, "404 Not Found", {"ok": False})
+        if method != "POST":
+            return _json_response(start_response, "405 Method Not Allowed", {"ok": False})
+        if secret and environ.get("HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN") != secret:
+            return _json_response(start_response, "403 Forbidden", {"ok": False})
+
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            update = json.loads(environ["wsgi.input"].read(length))
+        except ValueError:
+            return _json_response(start_response, "400 Bad Request", {"ok": False})
+        if not isinstance(update, dict):
+            return _json_response(start_response, "400 Bad Request", {"ok": False})
+
+        if not dispatcher.submit(update):
+            logger.warning(f"Очередь апдейтов полна, апдейт {update.get('update_id')} отклонен")
+            return _json_response(start_response, "503 Service Unavailable", {"ok": False})
+        return _json_response(start_response, "200 OK", {"ok": True})
+
+    return app
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve(app, host: str, port: int):
+    server = make_server(
+        host, port, app, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler
+    )
+    logger.info(f"Вебхук слушает {host}:{port}")
+    server.serve_forever()